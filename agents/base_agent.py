@@ -1,38 +1,279 @@
 """Base class for AI agents."""
+import asyncio
+import hashlib
+import json
 import logging
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Tuple, Type, TypeVar
 
-from langchain_anthropic import ChatAnthropic
-from langchain.schema import HumanMessage, SystemMessage
+import orjson
+from anthropic import AsyncAnthropic
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from config import get_settings
+from agents.llm_cache import LLMCache, create_llm_cache
+from utils.date_helpers import frozen_utc_now
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+LLM_CACHE_MAX_ENTRIES = 1024
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def prompt_json(payload: Any) -> str:
+    """Serialize a prompt payload as compact JSON with sorted keys for stable prompt text."""
+    return orjson.dumps(
+        payload, default=float, option=orjson.OPT_SORT_KEYS | orjson.OPT_NAIVE_UTC
+    ).decode()
+
+
+@lru_cache(maxsize=None)
+def _get_client() -> AsyncAnthropic:
+    """Return the process-wide Anthropic client so HTTP connections are reused."""
+    return AsyncAnthropic(api_key=settings.anthropic_api_key)
+
+
+@lru_cache(maxsize=None)
+def _tool_spec(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Describe a pydantic model as a tool whose input is the structured result."""
+    return {
+        "name": schema.__name__,
+        "description": schema.__doc__ or f"Record the {schema.__name__} result.",
+        "input_schema": schema.model_json_schema(),
+    }
+
+
+def _message_params(
+    system_message: str,
+    human_message: str,
+    temperature: float,
+    max_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Build Messages API parameters for a single-turn prompt."""
+    return {
+        "model": settings.llm_model,
+        "max_tokens": max_tokens or settings.llm_max_tokens,
+        "temperature": temperature,
+        "system": system_message,
+        "messages": [{"role": "user", "content": human_message}],
+    }
+
 
 class BaseAgent:
     """Base class providing shared LLM invocation for AI agents."""
 
+    response_cache: LLMCache = create_llm_cache(LLM_CACHE_MAX_ENTRIES)
+
     def __init__(self, db: Session, temperature: float = 0.3):
         self.db = db
-        self.llm = ChatAnthropic(
-            model=settings.llm_model,
-            anthropic_api_key=settings.anthropic_api_key,
-            temperature=temperature,
-        )
+        self.temperature = temperature
+        self.client = _get_client()
 
     async def _invoke_llm(
         self,
         system_message: str,
         human_message: str,
         log_message: str = "",
+        cache_ttl: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> str:
+        """Invoke LLM and return response content.
+
+        Identical prompts are answered from response_cache without calling the
+        API: deterministic (temperature 0) calls are cached for llm_cache_ttl,
+        others only when cache_ttl is given. temperature overrides the agent's
+        default for this call; max_tokens caps the output for calls that only
+        need a short answer.
+        """
+        return await self._complete(
+            system_message, human_message, log_message, cache_ttl, max_tokens, temperature
+        )
+
+    async def _invoke_llm_structured(
+        self,
+        system_message: str,
+        human_message: str,
+        schema: Type[ModelT],
+        log_message: str = "",
+        cache_ttl: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> ModelT:
+        """Invoke LLM with a forced tool call and return its input validated as schema.
+
+        Caching and sampling behave as in _invoke_llm.
+        """
+        content = await self._complete(
+            system_message, human_message, log_message, cache_ttl, max_tokens, temperature, schema
+        )
+        return schema.model_validate_json(content)
+
+    async def _complete(
+        self,
+        system_message: str,
+        human_message: str,
+        log_message: str,
+        cache_ttl: Optional[int],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        schema: Optional[Type[BaseModel]] = None,
     ) -> str:
-        """Invoke LLM and return response content."""
-        response = await self.llm.ainvoke([
-            SystemMessage(content=system_message),
-            HumanMessage(content=human_message),
-        ])
+        """Run one cached Messages API call; with schema, return the tool input as JSON."""
+        if temperature is None:
+            temperature = self.temperature
+        if cache_ttl is None and temperature == 0:
+            cache_ttl = settings.llm_cache_ttl
+
+        cache_key = None
+        if cache_ttl:
+            cache_key = self._cache_key(
+                system_message, human_message, max_tokens, temperature,
+                schema.__name__ if schema else None,
+            )
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("LLM cache hit")
+                return cached
+
+        params = _message_params(system_message, human_message, temperature, max_tokens)
+        if schema:
+            params["tools"] = [_tool_spec(schema)]
+            params["tool_choice"] = {"type": "tool", "name": schema.__name__}
+        response = await self.client.messages.create(**params)
+        if schema:
+            content = orjson.dumps(next(
+                block.input for block in response.content if block.type == "tool_use"
+            )).decode()
+        else:
+            content = response.content[0].text
+        usage = response.usage
+        logger.debug(
+            "LLM usage: input=%s output=%s cache_read=%s cache_write=%s",
+            usage.input_tokens,
+            usage.output_tokens,
+            getattr(usage, "cache_read_input_tokens", None),
+            getattr(usage, "cache_creation_input_tokens", None),
+        )
         if log_message:
             logger.info(log_message)
-        return response.content
+        if cache_key:
+            await self.response_cache.set(cache_key, content, cache_ttl)
+        return content
+
+    async def _stream_llm(
+        self,
+        system_message: str,
+        human_message: str,
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as the model generates them."""
+        async with self.client.messages.stream(
+            **_message_params(system_message, human_message, self.temperature)
+        ) as stream:
+            async for text in stream.text_stream:
+                if text:
+                    yield text
+
+    async def _stream_llm_decision(
+        self,
+        system_message: str,
+        human_message: str,
+        choices: Tuple[str, ...],
+    ) -> Optional[str]:
+        """Stream a response and return the first of choices it starts with.
+
+        The stream is closed as soon as the leading word decides the answer, so
+        the caller waits for roughly time-to-first-token instead of the full
+        generation. Returns None if the response does not start with a choice.
+        """
+        buffer = ""
+        longest = max(len(choice) for choice in choices)
+        async with self.client.messages.stream(
+            **_message_params(system_message, human_message, self.temperature)
+        ) as stream:
+            async for text in stream.text_stream:
+                buffer += text
+                head = buffer.lstrip().upper()
+                for choice in choices:
+                    if head.startswith(choice):
+                        return choice
+                if len(head) >= longest:
+                    return None
+        return None
+
+    async def _gather_bounded(
+        self,
+        calls: Iterable[Awaitable[Any]],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Any]:
+        """Await calls concurrently, at most max_concurrency (default llm_max_concurrency) at a time.
+
+        Results stamped with utc_now_iso share the batch's start time.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.llm_max_concurrency)
+
+        async def _bounded(call: Awaitable[Any]) -> Any:
+            async with semaphore:
+                return await call
+
+        with frozen_utc_now():
+            return list(await asyncio.gather(*[_bounded(call) for call in calls]))
+
+    async def _invoke_llm_batch(
+        self,
+        prompts: Dict[str, Tuple[str, str]],
+    ) -> Dict[str, Optional[str]]:
+        """Run (system, human) prompts through the Message Batches API.
+
+        Batches are billed at half the synchronous rate but complete
+        asynchronously, so this suits offline jobs only. Returns response text
+        keyed by the caller's custom_id; failed requests map to None.
+        """
+        client = self.client
+        batch = await client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": _message_params(system_message, human_message, self.temperature),
+                }
+                for custom_id, (system_message, human_message) in prompts.items()
+            ]
+        )
+        logger.info("Submitted LLM batch %s with %d requests", batch.id, len(prompts))
+
+        while batch.processing_status != "ended":
+            await asyncio.sleep(settings.llm_batch_poll_interval)
+            batch = await client.messages.batches.retrieve(batch.id)
+
+        results: Dict[str, Optional[str]] = dict.fromkeys(prompts)
+        async for entry in await client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = entry.result.message.content[0].text
+            else:
+                logger.warning("LLM batch request %s %s", entry.custom_id, entry.result.type)
+        return results
+
+    def _cache_key(
+        self,
+        system_message: str,
+        human_message: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        tool: Optional[str] = None,
+    ) -> str:
+        """Hash the model, sampling settings, tool and prompt into a cache key."""
+        payload = json.dumps(
+            {
+                "model": settings.llm_model,
+                "temperature": self.temperature if temperature is None else temperature,
+                "max_tokens": max_tokens,
+                "tool": tool,
+                "system": system_message,
+                "human": human_message,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
@@ -1,180 +1,396 @@
 """Billing Agent: charge calculation, invoice generation, and QuickBooks sync."""
+import asyncio
 import logging
+import math
 import time
-from typing import Optional, Dict, Any
-from decimal import Decimal
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Optional, Dict, Any, Iterator, List, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy.exc import SQLAlchemyError
 
-from models import Load, Invoice, Charge
+from config import get_settings
+from models import Load, Invoice, Charge, ChargeType
+from models.charge import charge_idempotency_key
+from models.database import db_session
+from metrics import MetricsCollector
 from services.charge_calculator import ChargeCalculator
 from services.invoice_generator import InvoiceGenerator
 from repositories.invoice_repository import InvoiceRepository
+from utils.async_helpers import run_sync
+from utils.date_helpers import to_iso
 from exceptions import (
     ChargeCalculationError,
     InvoiceGenerationError,
     QuickBooksAPIError,
     DatabaseError,
+    LoadNotFoundError,
 )
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_INSERT_BY_DIALECT = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+@dataclass(slots=True)
+class ChargePreviewRow:
+    description: str
+    rate: float
+    quantity: float
+    amount: float
+    start_date: Optional[str]
+    end_date: Optional[str]
+
+
+@dataclass
+class ChargePreview:
+    load_id: int
+    customer_name: str
+    customer_id: int
+    container_number: Optional[str]
+    charge_count: int
+    charges_by_type: Dict[str, List[ChargePreviewRow]]
+    total_amount: float
+    auto_invoice_enabled: bool
+    quickbooks_enabled: bool
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
 
 
 class BillingAgent:
     """Agent responsible for processing load billing and invoice generation."""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, charge_calculator: Optional[ChargeCalculator] = None):
         self.db = db
-        self.charge_calculator = ChargeCalculator(db)
+        self.charge_calculator = charge_calculator or ChargeCalculator(db)
         self.invoice_generator = InvoiceGenerator(db)
         self.invoice_repo = InvoiceRepository(db)
+        self._pending_qb_sync: Optional[List[Invoice]] = None
     
     def process_load_billing(
         self,
         load: Load,
-        auto_send: bool = True
+        auto_send: bool = True,
+        sync_quickbooks: bool = True,
+        persist_charges_only: bool = False,
     ) -> Optional[Invoice]:
-        """Calculate charges, generate invoice, and sync to QuickBooks."""
+        """Calculate charges, generate invoice, and sync to QuickBooks.
+
+        Loads of customers without auto-invoicing are skipped before any charge
+        work unless persist_charges_only is set, which saves the charges and
+        stops short of invoicing. With auto_send, the invoice is sent only
+        after charges and invoice are committed.
+        """
         start_time = time.time()
-        logger.info(f"Processing billing for load {load.id}")
+        logger.info("Processing billing for load %s", load.id)
+        customer = load.customer
+        
+        if not customer.auto_invoice and not persist_charges_only:
+            logger.info("Auto-invoicing disabled for customer %s", customer.name)
+            return None
         
         try:
             charges = self._calculate_charges(load)
             if charges:
-                self._save_charges(charges)
-                logger.info(
-                    f"Saved {len(charges)} charges for load {load.id}, "
-                    f"total: ${sum(c.amount for c in charges):.2f}"
-                )
+                charges = self._save_charges(charges)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        "Saved %d charges for load %s, total: $%.2f",
+                        len(charges), load.id, sum(c.amount for c in charges),
+                    )
             else:
-                logger.warning(f"No charges calculated for load {load.id}")
+                logger.warning("No charges calculated for load %s", load.id)
             
-            if not load.customer.auto_invoice:
-                logger.info(
-                    f"Auto-invoicing disabled for customer {load.customer.name}"
-                )
+            if persist_charges_only or not customer.auto_invoice:
+                self.db.commit()
                 return None
             
-            invoice = self._generate_invoice(load, charges, auto_send)
-            if invoice and load.customer.quickbooks_customer_id:
-                self._sync_to_quickbooks(invoice)
+            invoice = self._generate_invoice(load, charges)
+            self.db.commit()
+            if invoice and sync_quickbooks and customer.quickbooks_customer_id:
+                if self._pending_qb_sync is not None:
+                    self._pending_qb_sync.append(invoice)
+                else:
+                    self._sync_to_quickbooks(invoice)
+            if invoice and auto_send:
+                self.invoice_generator.send_to_customer(invoice)
             
-            elapsed_time = time.time() - start_time
-            logger.info(
-                f"Successfully processed billing for load {load.id}, "
-                f"invoice: {invoice.id if invoice else 'N/A'}, "
-                f"elapsed: {elapsed_time:.2f}s"
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Successfully processed billing for load %s, invoice: %s, elapsed: %.2fs",
+                    load.id, invoice.id if invoice else 'N/A', time.time() - start_time,
+                )
             
             return invoice
             
         except (ChargeCalculationError, InvoiceGenerationError):
+            self.db.rollback()
             raise
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Database error processing load {load.id}: {e}")
+            logger.error("Database error processing load %s: %s", load.id, e)
             raise DatabaseError(f"Database error processing load {load.id}") from e
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Unexpected error processing load {load.id}: {e}", exc_info=True)
+            logger.error("Unexpected error processing load %s: %s", load.id, e, exc_info=True)
             raise
+
+    async def process_loads_bulk(
+        self,
+        loads: List[Load],
+        auto_send: bool = True,
+        max_concurrency: Optional[int] = None,
+    ) -> List[Union[Optional[int], BaseException]]:
+        """Bill many loads concurrently; returns invoice IDs (or the exception) per load.
+
+        Each load is billed in a worker thread with its own session, so one
+        failing load neither blocks nor rolls back the others. QuickBooks sync
+        runs afterwards as batch requests for all new invoices.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.billing_max_concurrency)
+
+        async def _one(load_id: int) -> Optional[int]:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    _process_load_in_session, load_id, auto_send, self.charge_calculator
+                )
+
+        results = await asyncio.gather(
+            *[_one(load.id) for load in loads], return_exceptions=True
+        )
+        failed = sum(1 for r in results if isinstance(r, BaseException))
+        logger.info("Bulk billing complete: %d succeeded, %d failed", len(loads) - failed, failed)
+
+        invoice_ids = [r for r in results if isinstance(r, int)]
+        if invoice_ids:
+            await self._sync_invoices_to_quickbooks(invoice_ids)
+        return results
+
+    def batch_process_loads(
+        self,
+        load_ids: List[int],
+        auto_send: bool = True,
+        workers: Optional[int] = None,
+        persist_charges_only: bool = False,
+    ) -> List[Union[Optional[int], BaseException]]:
+        """Bill loads on a thread pool for sync callers; returns invoice IDs (or the exception) per load.
+
+        Each worker bills in its own session. New invoices are synced to
+        QuickBooks in batch requests once all loads are done. With
+        persist_charges_only, charges are saved without invoicing, as in
+        process_load_billing.
+        """
+        workers = workers or min(settings.billing_max_concurrency, settings.db_pool_size)
+        results: List[Union[Optional[int], BaseException]] = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _process_load_in_session,
+                    load_id, auto_send, self.charge_calculator, persist_charges_only,
+                )
+                for load_id in load_ids
+            ]
+            for load_id, future in zip(load_ids, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error("Error processing billing for load %s: %s", load_id, e)
+                    results.append(e)
+
+        failed = sum(1 for r in results if isinstance(r, BaseException))
+        logger.info("Batch billing complete: %d succeeded, %d failed", len(load_ids) - failed, failed)
+
+        invoice_ids = [r for r in results if isinstance(r, int)]
+        if invoice_ids:
+            run_sync(self._sync_invoices_to_quickbooks(invoice_ids))
+        return results
+
+    async def _sync_invoices_to_quickbooks(self, invoice_ids: List[int]) -> int:
+        """Sync newly created invoices to QuickBooks in batch requests."""
+        invoices = (
+            self.db.query(Invoice)
+            .options(joinedload(Invoice.customer), selectinload(Invoice.line_items))
+            .filter(Invoice.id.in_(invoice_ids))
+            .all()
+        )
+        synced = await self.invoice_generator.sync_invoices_to_quickbooks(invoices)
+        logger.info("QuickBooks sync complete: %d/%d invoices synced", synced, len(invoice_ids))
+        return synced
+
+    @contextmanager
+    def billing_run(self) -> Iterator["BillingAgent"]:
+        """Defer QuickBooks sync for loads billed inside the block and batch it on exit."""
+        self._pending_qb_sync = []
+        try:
+            yield self
+        finally:
+            pending, self._pending_qb_sync = self._pending_qb_sync, None
+            if pending:
+                self.flush_quickbooks(pending)
+
+    def flush_quickbooks(self, invoices: List[Invoice]) -> int:
+        """Sync deferred invoices to QuickBooks in batch requests.
+
+        For sync callers only: raises RuntimeError inside a running event loop,
+        where invoice_generator.sync_invoices_to_quickbooks must be awaited.
+        """
+        return run_sync(self.invoice_generator.sync_invoices_to_quickbooks(invoices))
     
     def _calculate_charges(self, load: Load) -> list[Charge]:
         """Calculate all charges for a load."""
         try:
             return self.charge_calculator.calculate_all_charges(load)
         except Exception as e:
-            logger.error(f"Failed to calculate charges for load {load.id}: {e}")
+            logger.error("Failed to calculate charges for load %s: %s", load.id, e)
             raise ChargeCalculationError(f"Failed to calculate charges for load {load.id}") from e
     
-    def _save_charges(self, charges: list[Charge]) -> None:
-        """Save charges to database."""
+    def _save_charges(self, charges: list[Charge]) -> list[Charge]:
+        """Bulk insert charges in one statement and return the persisted rows.
+
+        Charges whose idempotency key (load, type, start date) is already saved
+        are skipped, so retrying a load is a no-op instead of duplicating
+        charges; the load's uninvoiced charges are returned in that case. Does
+        not commit; the caller commits charges and invoice together.
+
+        Dialects without ON CONFLICT DO NOTHING support fall back to checking
+        for saved keys before a plain ORM insert.
+        """
+        dialect_insert = _INSERT_BY_DIALECT.get(self.db.get_bind().dialect.name)
         try:
-            self.db.add_all(charges)
-            self.db.commit()
+            if dialect_insert is None:
+                saved = self._insert_unsaved_charges(charges)
+            else:
+                column_keys = [attr.key for attr in inspect(Charge).column_attrs]
+                rows = [
+                    {key: charge.__dict__[key] for key in column_keys if key in charge.__dict__}
+                    for charge in charges
+                ]
+                stmt = dialect_insert(Charge).on_conflict_do_nothing(index_elements=[Charge.idempotency_key])
+                saved = list(self.db.scalars(stmt.returning(Charge), rows).all())
+            if len(saved) < len(charges):
+                logger.info("Skipped %d already saved charges", len(charges) - len(saved))
+                saved = list(self.db.scalars(
+                    select(Charge).where(
+                        Charge.load_id.in_({charge.load_id for charge in charges}),
+                        Charge.invoice_id.is_(None),
+                    )
+                ).all())
+            return saved
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Failed to save charges: {e}")
+            logger.error("Failed to save charges: %s", e)
             raise DatabaseError("Failed to save charges") from e
     
-    def _generate_invoice(self, load: Load, charges: list[Charge], auto_send: bool) -> Optional[Invoice]:
-        """Generate invoice for load and charges."""
+    def _insert_unsaved_charges(self, charges: list[Charge]) -> list[Charge]:
+        """Add the charges whose idempotency key is not saved yet and return them.
+
+        A concurrent insert of the same key still fails on the unique constraint.
+        """
+        unsaved: Dict[str, Charge] = {}
+        for charge in charges:
+            charge.idempotency_key = charge_idempotency_key(charge.load_id, charge.charge_type, charge.start_date)
+            unsaved.setdefault(charge.idempotency_key, charge)
+        saved_keys = set(self.db.scalars(
+            select(Charge.idempotency_key).where(Charge.idempotency_key.in_(list(unsaved)))
+        ).all())
+        new_charges = [charge for key, charge in unsaved.items() if key not in saved_keys]
+        self.db.add_all(new_charges)
+        self.db.flush()
+        return new_charges
+
+    def _generate_invoice(self, load: Load, charges: list[Charge]) -> Optional[Invoice]:
+        """Generate invoice for load and charges; the caller commits and sends it."""
         try:
-            return self.invoice_generator.create_invoice_from_load(load, charges, auto_send=auto_send)
+            return self.invoice_generator.create_invoice_from_load(load, charges, commit=False)
         except Exception as e:
-            logger.error(f"Failed to generate invoice for load {load.id}: {e}")
+            logger.error("Failed to generate invoice for load %s: %s", load.id, e)
             raise InvoiceGenerationError(f"Failed to generate invoice for load {load.id}") from e
     
     def _sync_to_quickbooks(self, invoice: Invoice) -> None:
         """Sync invoice to QuickBooks."""
         try:
             self.invoice_generator.sync_to_quickbooks(invoice)
-            logger.info(f"Synced invoice {invoice.id} to QuickBooks")
+            logger.info("Synced invoice %s to QuickBooks", invoice.id)
         except Exception as e:
-            logger.error(f"Failed to sync invoice {invoice.id} to QuickBooks: {e}", exc_info=True)
+            logger.error("Failed to sync invoice %s to QuickBooks: %s", invoice.id, e, exc_info=True)
             raise QuickBooksAPIError(f"Failed to sync invoice {invoice.id} to QuickBooks") from e
     
-    def preview_charges(self, load: Load) -> Dict[str, Any]:
+    def preview_charges(self, load: Load) -> ChargePreview:
         """Preview charges for a load without saving to database."""
-        logger.info(f"Previewing charges for load {load.id}")
+        logger.info("Previewing charges for load %s", load.id)
         
         try:
             charges = self._calculate_charges(load)
             
-            charges_by_type = {}
-            total_amount = Decimal('0.00')
+            customer = load.customer
+            container = load.container
+            charges_by_type = defaultdict(list)
+            amounts = []
             
             for charge in charges:
-                charge_type = getattr(charge.charge_type, 'value', str(charge.charge_type))
-                if charge_type not in charges_by_type:
-                    charges_by_type[charge_type] = []
-                charges_by_type[charge_type].append({
-                    'description': charge.description,
-                    'rate': float(charge.rate),
-                    'quantity': float(charge.quantity),
-                    'amount': float(charge.amount),
-                    'start_date': charge.start_date.isoformat() if charge.start_date else None,
-                    'end_date': charge.end_date.isoformat() if charge.end_date else None,
-                })
-                total_amount += Decimal(str(charge.amount))
-            
-            preview = {
-                'load_id': load.id,
-                'customer_name': load.customer.name,
-                'customer_id': load.customer.id,
-                'container_number': load.container.container_number if load.container else None,
-                'charge_count': len(charges),
-                'charges_by_type': charges_by_type,
-                'total_amount': float(total_amount),
-                'auto_invoice_enabled': load.customer.auto_invoice,
-                'quickbooks_enabled': bool(load.customer.quickbooks_customer_id),
-            }
+                amount = float(charge.amount)
+                charges_by_type[_charge_type_value(charge)].append(ChargePreviewRow(
+                    description=charge.description,
+                    rate=float(charge.rate),
+                    quantity=float(charge.quantity),
+                    amount=amount,
+                    start_date=to_iso(charge.start_date),
+                    end_date=to_iso(charge.end_date),
+                ))
+                amounts.append(amount)
+            
+            total_amount = round(math.fsum(amounts), 2)
+            
+            preview = ChargePreview(
+                load_id=load.id,
+                customer_name=customer.name,
+                customer_id=customer.id,
+                container_number=container.container_number if container else None,
+                charge_count=len(charges),
+                charges_by_type=dict(charges_by_type),
+                total_amount=total_amount,
+                auto_invoice_enabled=customer.auto_invoice,
+                quickbooks_enabled=bool(customer.quickbooks_customer_id),
+            )
             
             logger.info(
-                f"Preview complete for load {load.id}: "
-                f"{len(charges)} charges, total ${total_amount:.2f}"
+                "Preview complete for load %s: %d charges, total $%.2f",
+                load.id, len(charges), total_amount,
             )
             
             return preview
             
         except Exception as e:
-            logger.error(f"Failed to preview charges for load {load.id}: {e}")
+            logger.error("Failed to preview charges for load %s: %s", load.id, e)
             raise ChargeCalculationError(
                 f"Failed to preview charges for load {load.id}"
             ) from e
     
     def get_billing_summary(self, load: Load) -> Dict[str, Any]:
         """Get a comprehensive billing summary for a load."""
-        logger.info(f"Getting billing summary for load {load.id}")
+        logger.info("Getting billing summary for load %s", load.id)
 
         try:
-            existing_charges = (
-                self.db.query(Charge).filter(Charge.load_id == load.id).all()
+            load = (
+                self.db.query(Load)
+                .options(joinedload(Load.customer), joinedload(Load.container))
+                .filter(Load.id == load.id)
+                .one()
             )
+            charges_by_type = self._charge_totals_by_type(load.id)
             existing_invoices = self.invoice_repo.get_by_load(load.id)
             
-            total_charges = sum(c.amount for c in existing_charges)
+            charge_count = sum(b['count'] for b in charges_by_type.values())
+            total_charges = sum(b['total'] for b in charges_by_type.values())
             total_invoiced = sum(i.total_amount for i in existing_invoices)
             
             summary = {
@@ -182,9 +398,9 @@ class BillingAgent:
                 'customer_name': load.customer.name,
                 'status': getattr(load.status, 'value', str(load.status)),
                 'charges': {
-                    'count': len(existing_charges),
+                    'count': charge_count,
                     'total': float(total_charges),
-                    'by_type': self._group_charges_by_type(existing_charges),
+                    'by_type': charges_by_type,
                 },
                 'invoices': {
                     'count': len(existing_invoices),
@@ -208,27 +424,71 @@ class BillingAgent:
             }
             
             logger.info(
-                f"Billing summary for load {load.id}: "
-                f"{len(existing_charges)} charges (${total_charges:.2f}), "
-                f"{len(existing_invoices)} invoices (${total_invoiced:.2f})"
+                "Billing summary for load %s: %d charges ($%.2f), %d invoices ($%.2f)",
+                load.id, charge_count, total_charges, len(existing_invoices), total_invoiced,
             )
             
             return summary
             
         except Exception as e:
-            logger.error(f"Failed to get billing summary for load {load.id}: {e}")
+            logger.error("Failed to get billing summary for load %s: %s", load.id, e)
             raise
     
-    def _group_charges_by_type(self, charges: list[Charge]) -> Dict[str, Dict[str, Any]]:
-        """Group charges by type with totals."""
-        grouped = {}
-        
-        for charge in charges:
-            charge_type = getattr(charge.charge_type, 'value', str(charge.charge_type))
-            if charge_type not in grouped:
-                grouped[charge_type] = {'count': 0, 'total': 0.0}
-            grouped[charge_type]['count'] += 1
-            grouped[charge_type]['total'] += float(charge.amount)
-        
-        return grouped
+    def get_billing_metrics(self, days: int = 30) -> Dict[str, Any]:
+        """Get aggregated billing metrics for the last N days."""
+        end_date = date.today()
+        metrics = MetricsCollector(self.db).get_billing_metrics(
+            end_date - timedelta(days=days), end_date
+        ).to_dict()
+        metrics['period_start'] = metrics['period_start'].isoformat()
+        metrics['period_end'] = metrics['period_end'].isoformat()
+        return metrics
+    
+    def _charge_totals_by_type(self, load_id: int) -> Dict[str, Dict[str, Any]]:
+        """Count and total a load's charges per type in SQL."""
+        rows = (
+            self.db.query(Charge.charge_type, func.count(Charge.id), func.sum(Charge.amount))
+            .filter(Charge.load_id == load_id)
+            .group_by(Charge.charge_type)
+            .all()
+        )
+        return {
+            getattr(charge_type, 'value', str(charge_type)): {
+                'count': count,
+                'total': float(total or 0.0),
+            }
+            for charge_type, count, total in rows
+        }
+
+
+def _charge_type_value(charge: Charge) -> str:
+    """Return the charge type as its string value."""
+    charge_type = charge.charge_type
+    return charge_type.value if isinstance(charge_type, ChargeType) else str(charge_type)
+
+
+def _process_load_in_session(
+    load_id: int,
+    auto_send: bool,
+    charge_calculator: Optional[ChargeCalculator] = None,
+    persist_charges_only: bool = False,
+) -> Optional[int]:
+    """Bill a single load in its own session; safe to run in a worker thread.
+
+    Passing a shared charge_calculator lets its customer rate cache carry
+    across the loads of a bulk run.
+    """
+    with db_session() as db:
+        load = db.get(
+            Load,
+            load_id,
+            options=[joinedload(Load.customer), joinedload(Load.container)],
+        )
+        if load is None:
+            raise LoadNotFoundError(f"Load {load_id} not found")
+        invoice = BillingAgent(db, charge_calculator).process_load_billing(
+            load, auto_send=auto_send, sync_quickbooks=False,
+            persist_charges_only=persist_charges_only,
+        )
+        return invoice.id if invoice else None
 
@@ -1,19 +1,84 @@
 """AI Agent for handling billing disputes."""
+import asyncio
 import logging
-from datetime import datetime
-from typing import Dict, Optional, Any, List
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 from enum import Enum
 
-from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from models import Invoice
+from models import Invoice, Charge
 from config import get_settings
-from agents.base_agent import BaseAgent
+from agents.base_agent import BaseAgent, prompt_json
+from utils.date_helpers import to_iso, utc_now_iso
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+CLASSIFICATION_MAX_TOKENS = 300
+CLASSIFICATION_TEMPERATURE = 0.0
+SENTIMENT_CACHE_TTL = 1800
+CATEGORIZATION_CACHE_TTL = 86400
+TOP_CHARGES_IN_SUMMARY = 5
+SUMMARY_MAX_MESSAGE_CHARS = 20_000
+GOODWILL_MINOR_RATE = 0.05
+GOODWILL_CLV_CAP_RATE = 0.02
+GOODWILL_RULE_MIN_CONFIDENCE = 0.85
+GOODWILL_MINOR_AMOUNT_CAP = 250.0
+
+_THREAT_PHRASES = (
+    r"(?:will|going to|plan(?:ning)? to|intend to) sue"
+    r"|sue you"
+    r"|(?:take|taking) you to (?:court|small claims)"
+    r"|(?:take|taking|pursue|pursuing) legal action"
+    r"|(?:contact|contacting|call|calling|refer(?:ring)? this to) (?:our|my) (?:attorney|lawyer)s?"
+    r"|(?:attorney|lawyer)s? will"
+    r"|(?:file|filing|issue|issuing) (?:a )?chargebacks?"
+    r"|report(?:ing)? (?:you |this )?to the (?:bbb|better business bureau)"
+    r"|small claims"
+    r"|lawsuit"
+)
+_THREAT_RE = re.compile(rf"\b(?:{_THREAT_PHRASES})\b", re.IGNORECASE)
+_THREAT_HINT_RE = re.compile(
+    r"\b(?:sue|suing|attorneys?|lawyers?|legal|bbb|chargebacks?|cancel\w*|terminat\w*|unacceptable)\b",
+    re.IGNORECASE,
+)
+_SEVERE_COMPLAINT_RE = re.compile(
+    rf"\b(?:{_THREAT_PHRASES}|fraud\w*"
+    r"|cancel\w* (?:our|the|this) (?:contract|account|service)"
+    r"|terminat\w* (?:our|the|this) (?:contract|agreement|relationship))\b",
+    re.IGNORECASE,
+)
+_MINOR_COMPLAINT_RE = re.compile(r"\b(minor|slight(ly)?|inconvenien\w*|typo)\b", re.IGNORECASE)
+_VAGUE_COMPLAINT_RE = re.compile(r"\b(small|late|delay(ed|s)?)\b", re.IGNORECASE)
+_DOLLAR_AMOUNT_RE = re.compile(r"\$\s?(\d[\d,]*(?:\.\d+)?)")
+
+DISPUTE_RESPONSE_SYSTEM_PROMPT = """You are a professional customer service representative for a trucking company.
+Draft a polite, professional email response to a customer who disputed an invoice.
+Your email should clearly explain each charge, reference specific dates and rates,
+offer documentation, and maintain a firm but courteous tone.
+Format: Subject line, greeting, structured body, professional closing."""
+
+DISPUTE_ANALYSIS_SYSTEM_PROMPT = """You are a billing dispute analyst for a trucking company.
+Determine if the dispute is valid, which charges are questionable,
+and recommend action (write off, negotiate, or stand firm).
+Consider charge accuracy, industry standards, customer value, and AI confidence scores."""
+
+COLLECTIONS_SYSTEM_PROMPT = """You are a professional accounts receivable specialist.
+Draft a collections email in the tone given with the request. Be professional,
+state the amount owed, include payment options, and set clear expectations.
+Format as a complete email with subject line."""
+
+RESOLUTION_SYSTEM_PROMPT = """You are a customer service manager and conflict resolution expert.
+Suggest the best resolution: write-off amount, credit to apply, revised invoice,
+or process improvements. Balance customer satisfaction with company revenue.
+Be specific and actionable."""
+
+
 class DisputeCategory(str, Enum):
     """Categories of dispute types."""
     PRICING_ERROR = "pricing_error"
@@ -34,74 +99,287 @@ class DisputeSentiment(str, Enum):
     THREATENING = "threatening"
 
 
-def _charge_summary(invoice: Invoice) -> list[dict]:
-    """Build a compact charge list from an invoice."""
+class SentimentAnalysis(BaseModel):
+    """Structured sentiment analysis of a dispute message."""
+    sentiment: DisputeSentiment
+    urgency: Literal["low", "medium", "high", "critical"]
+    key_concerns: List[str] = []
+    tone_indicators: List[str] = []
+    recommended_response_time: Optional[str] = None
+
+
+class DisputeCategorization(BaseModel):
+    """Structured categorization of a dispute."""
+    primary_category: DisputeCategory
+    confidence: float
+    secondary_categories: List[DisputeCategory] = []
+    reasoning: Optional[str] = None
+
+
+class DisputeTriage(BaseModel):
+    """Combined sentiment analysis and categorization."""
+    sentiment_analysis: SentimentAnalysis
+    categorization: DisputeCategorization
+
+
+DISPUTE_CATEGORIES = ", ".join(cat.value for cat in DisputeCategory)
+
+SENTIMENT_SYSTEM_PROMPT = """You are a sentiment analysis expert.
+Determine sentiment (positive/neutral/frustrated/angry/threatening),
+urgency (low/medium/high/critical), key concerns, and tone indicators."""
+
+CATEGORIZATION_SYSTEM_PROMPT = f"""You are a billing dispute categorization expert.
+Categorize into one of: {DISPUTE_CATEGORIES}.
+Provide primary category, confidence (0-1), secondary categories, and reasoning."""
+
+TRIAGE_SYSTEM_PROMPT = f"""You are a billing dispute triage expert.
+Determine sentiment (positive/neutral/frustrated/angry/threatening),
+urgency (low/medium/high/critical), key concerns, and tone indicators.
+Categorize the dispute into one of: {DISPUTE_CATEGORIES},
+with confidence (0-1), secondary categories, and reasoning."""
+
+SUMMARY_SYSTEM_PROMPT = """You are an executive assistant summarizing dispute cases.
+Create a concise summary (<200 words) covering: key facts, customer concerns,
+current status, recommended actions, and risk level (low/medium/high)."""
+
+GOODWILL_SYSTEM_PROMPT = """You are a customer retention specialist.
+Recommend a goodwill credit: specific dollar amount or percentage, justification,
+how to present it, and any additional gestures. Balance satisfaction with profitability."""
+
+
+@dataclass(slots=True)
+class ChargeLite:
+    """Plain-float snapshot of a charge for prompt building."""
+    type: str
+    description: str
+    amount: float
+    quantity: float
+    rate: float
+    start_date: Optional[str]
+    end_date: Optional[str]
+    is_disputed: bool
+    confidence: float
+
+    @classmethod
+    def from_charge(cls, c: Charge) -> "ChargeLite":
+        return cls(
+            type=c.charge_type.value,
+            description=c.description,
+            amount=float(c.amount),
+            quantity=float(c.quantity),
+            rate=float(c.rate),
+            start_date=to_iso(c.start_date),
+            end_date=to_iso(c.end_date),
+            is_disputed=bool(c.is_disputed),
+            confidence=float(c.ai_confidence_score) if c.ai_confidence_score else 0,
+        )
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "ChargeLite":
+        charge_type, description, amount, quantity, rate, start_date, end_date, is_disputed, confidence = row
+        return cls(
+            type=charge_type.value,
+            description=description,
+            amount=float(amount),
+            quantity=float(quantity),
+            rate=float(rate),
+            start_date=to_iso(start_date),
+            end_date=to_iso(end_date),
+            is_disputed=bool(is_disputed),
+            confidence=float(confidence) if confidence else 0,
+        )
+
+
+_CHARGE_LITE_COLUMNS = (
+    Charge.charge_type,
+    Charge.description,
+    Charge.amount,
+    Charge.quantity,
+    Charge.rate,
+    Charge.start_date,
+    Charge.end_date,
+    Charge.is_disputed,
+    Charge.ai_confidence_score,
+)
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_message(text: str) -> str:
+    """Collapse whitespace in free text so trivially different messages share a cache entry."""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _charge_lites(db: Session, invoice: Invoice) -> list[ChargeLite]:
+    """Snapshot an invoice's charges, projecting the columns in SQL unless already loaded."""
+    if "charges" in invoice.__dict__:
+        return [ChargeLite.from_charge(c) for c in invoice.charges]
+    rows = db.execute(select(*_CHARGE_LITE_COLUMNS).where(Charge.invoice_id == invoice.id))
+    return [ChargeLite.from_row(row) for row in rows]
+
+
+def _charge_summary(charges: list[ChargeLite]) -> list[dict]:
+    """Build a compact charge list for prompts."""
     return [
         {
-            "type": c.charge_type.value,
+            "type": c.type,
             "description": c.description,
-            "amount": float(c.amount),
-            "quantity": float(c.quantity),
-            "rate": float(c.rate),
-            "start_date": c.start_date.isoformat() if c.start_date else None,
-            "end_date": c.end_date.isoformat() if c.end_date else None,
+            "amount": c.amount,
+            "quantity": c.quantity,
+            "rate": c.rate,
+            "start_date": c.start_date,
+            "end_date": c.end_date,
         }
-        for c in invoice.charges
+        for c in charges
     ]
 
 
-def _charge_brief(invoice: Invoice) -> list[dict]:
-    """Build a brief charge list (type, amount, description) from an invoice."""
+def _charge_brief(charges: list[ChargeLite]) -> list[dict]:
+    """Build a brief charge list (type, amount, description) for prompts."""
     return [
-        {"type": c.charge_type.value, "amount": float(c.amount), "description": c.description}
-        for c in invoice.charges
+        {"type": c.type, "amount": c.amount, "description": c.description}
+        for c in charges
     ]
 
 
+def _summarize_charges(charges: list[ChargeLite]) -> dict:
+    """Aggregate charges by type plus the largest few, so prompt size stays flat for long invoices."""
+    by_type: Dict[str, Dict[str, Any]] = {}
+    for c in charges:
+        bucket = by_type.setdefault(c.type, {"count": 0, "total": 0.0})
+        bucket["count"] += 1
+        bucket["total"] += c.amount
+    top = sorted(charges, key=lambda c: c.amount, reverse=True)[:TOP_CHARGES_IN_SUMMARY]
+    return {
+        "n_charges": len(charges),
+        "by_type": by_type,
+        "top_charges": _charge_brief(top),
+    }
+
+
+def _recent_messages(messages: List[str], max_chars: int = SUMMARY_MAX_MESSAGE_CHARS) -> List[str]:
+    """Keep the newest messages that fit within max_chars, dropping the oldest first."""
+    kept: List[str] = []
+    used = 0
+    for message in reversed(messages):
+        used += len(message)
+        if used > max_chars and kept:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+
 class DisputeAgent(BaseAgent):
-    """AI Agent for handling payment disputes and customer communications."""
+    """AI Agent for handling payment disputes and customer communications.
+
+    Invoices should be fetched with load_invoice/load_invoices so the customer
+    and charges arrive with them; charges are projected in SQL when an invoice
+    is passed in without them.
+    """
 
     def __init__(self, db: Session):
         super().__init__(db, temperature=settings.llm_temperature_creative)
+        self._charge_snapshots: Dict[int, list[ChargeLite]] = {}
+
+    def load_invoice(self, invoice_id: int) -> Optional[Invoice]:
+        """Fetch an invoice with its customer and charges eager-loaded."""
+        return self.db.get(
+            Invoice,
+            invoice_id,
+            options=[joinedload(Invoice.customer), selectinload(Invoice.charges)],
+        )
+
+    def load_invoices(self, invoice_ids: List[int]) -> List[Invoice]:
+        """Fetch invoices with customers joined and all charges in one IN query."""
+        return list(self.db.scalars(
+            select(Invoice)
+            .options(joinedload(Invoice.customer), selectinload(Invoice.charges))
+            .where(Invoice.id.in_(invoice_ids))
+        ).unique())
+
+    def _charges_for(self, invoice: Invoice) -> list[ChargeLite]:
+        """Return the invoice's charge snapshot, built once per agent instance."""
+        charges = self._charge_snapshots.get(invoice.id)
+        if charges is None:
+            charges = self._charge_snapshots[invoice.id] = _charge_lites(self.db, invoice)
+        return charges
+
+    def _dispute_response_prompt(
+        self,
+        invoice: Invoice,
+        dispute_reason: Optional[str] = None,
+        charges: Optional[list[ChargeLite]] = None,
+    ) -> str:
+        """Build the human prompt for a dispute response email."""
+        if charges is None:
+            charges = self._charges_for(invoice)
+        context = {
+            "invoice_number": invoice.invoice_number,
+            "customer_name": invoice.customer.name,
+            "invoice_amount": float(invoice.total_amount),
+            "amount_paid": float(invoice.amount_paid) if invoice.amount_paid else 0,
+            "dispute_amount": float(invoice.dispute_amount) if invoice.dispute_amount else 0,
+            "charges": _charge_summary(charges),
+            "dispute_reason": dispute_reason or "Not specified",
+        }
+        return f"Customer disputed invoice details:\n{prompt_json(context)}\n\nPlease draft a response email."
 
     async def draft_dispute_response(
         self,
         invoice: Invoice,
         dispute_reason: Optional[str] = None,
+        charges: Optional[list[ChargeLite]] = None,
     ) -> Dict[str, Any]:
         """Draft professional email response to disputed invoice."""
         try:
-            context = {
-                "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
-                "invoice_amount": float(invoice.total_amount),
-                "amount_paid": float(invoice.amount_paid) if invoice.amount_paid else 0,
-                "dispute_amount": float(invoice.dispute_amount) if invoice.dispute_amount else 0,
-                "charges": _charge_summary(invoice),
-                "dispute_reason": dispute_reason or "Not specified",
-            }
             content = await self._invoke_llm(
-                system_message="""You are a professional customer service representative for a trucking company.
-                Draft a polite, professional email response to a customer who disputed an invoice.
-                Your email should clearly explain each charge, reference specific dates and rates,
-                offer documentation, and maintain a firm but courteous tone.
-                Format: Subject line, greeting, structured body, professional closing.""",
-                human_message=f"Customer disputed invoice details:\n{context}\n\nPlease draft a response email.",
+                system_message=DISPUTE_RESPONSE_SYSTEM_PROMPT,
+                human_message=self._dispute_response_prompt(invoice, dispute_reason, charges),
                 log_message=f"Generated dispute response for invoice {invoice.invoice_number}",
             )
             return {
                 "invoice_number": invoice.invoice_number,
                 "customer_name": invoice.customer.name,
                 "email_draft": content,
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
             }
         except Exception as e:
-            logger.error(f"Error drafting dispute response: {e}")
+            logger.error("Error drafting dispute response: %s", e)
             return {"error": str(e)}
 
-    async def analyze_dispute(self, invoice: Invoice) -> Dict[str, Any]:
+    async def draft_dispute_responses(
+        self,
+        items: List[Tuple[Invoice, Optional[str]]],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Draft dispute responses for many (invoice, dispute_reason) pairs concurrently."""
+        return await self._gather_bounded(
+            (self.draft_dispute_response(invoice, reason) for invoice, reason in items),
+            max_concurrency,
+        )
+
+    async def stream_dispute_response(
+        self,
+        invoice: Invoice,
+        dispute_reason: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Stream a dispute response email draft as it is generated."""
+        human_message = self._dispute_response_prompt(invoice, dispute_reason)
+        async for text in self._stream_llm(DISPUTE_RESPONSE_SYSTEM_PROMPT, human_message):
+            yield text
+        logger.info("Streamed dispute response for invoice %s", invoice.invoice_number)
+
+    async def analyze_dispute(
+        self,
+        invoice: Invoice,
+        charges: Optional[list[ChargeLite]] = None,
+    ) -> Dict[str, Any]:
         """Analyze dispute validity and recommend action."""
         try:
+            if charges is None:
+                charges = self._charges_for(invoice)
             context = {
                 "invoice_number": invoice.invoice_number,
                 "customer_name": invoice.customer.name,
@@ -110,28 +388,85 @@ class DisputeAgent(BaseAgent):
                 "dispute_amount": float(invoice.dispute_amount) if invoice.dispute_amount else 0,
                 "dispute_reason": invoice.dispute_reason,
                 "charges": [
-                    {**b, "is_disputed": c.is_disputed,
-                     "confidence": float(c.ai_confidence_score) if c.ai_confidence_score else 0}
-                    for b, c in zip(_charge_brief(invoice), invoice.charges)
+                    {"type": c.type, "amount": c.amount, "description": c.description,
+                     "is_disputed": c.is_disputed, "confidence": c.confidence}
+                    for c in charges
                 ],
             }
             content = await self._invoke_llm(
-                system_message="""You are a billing dispute analyst for a trucking company.
-                Determine if the dispute is valid, which charges are questionable,
-                and recommend action (write off, negotiate, or stand firm).
-                Consider charge accuracy, industry standards, customer value, and AI confidence scores.""",
-                human_message=f"Analyze this dispute: {context}",
+                system_message=DISPUTE_ANALYSIS_SYSTEM_PROMPT,
+                human_message=f"Analyze this dispute: {prompt_json(context)}",
                 log_message=f"Analyzed dispute for invoice {invoice.invoice_number}",
             )
             return {
                 "invoice_number": invoice.invoice_number,
                 "analysis": content,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": utc_now_iso(),
             }
         except Exception as e:
-            logger.error(f"Error analyzing dispute: {e}")
+            logger.error("Error analyzing dispute: %s", e)
             return {"error": str(e)}
 
+    async def analyze_disputes(
+        self,
+        invoices: List[Invoice],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Analyze many disputed invoices concurrently."""
+        return await self._gather_bounded(
+            (self.analyze_dispute(invoice) for invoice in invoices),
+            max_concurrency,
+        )
+
+    async def analyze_dispute_bundle(
+        self,
+        invoice: Invoice,
+        customer_message: str,
+    ) -> Dict[str, Any]:
+        """Run dispute analysis, response draft and sentiment analysis concurrently."""
+        charges = self._charges_for(invoice)
+        analysis, response, sentiment = await asyncio.gather(
+            self.analyze_dispute(invoice, charges=charges),
+            self.draft_dispute_response(invoice, customer_message, charges=charges),
+            self.analyze_dispute_sentiment(customer_message),
+        )
+        return {
+            "invoice_number": invoice.invoice_number,
+            "analysis": analysis,
+            "response": response,
+            "sentiment": sentiment,
+        }
+
+    def _collections_prompt(self, invoice: Invoice, days_overdue: int) -> Tuple[str, str]:
+        """Build the (system, human) prompt pair for a collections email."""
+        if days_overdue <= 7:
+            tone = "friendly reminder"
+        elif days_overdue <= 30:
+            tone = "polite but urgent"
+        else:
+            tone = "formal and serious"
+
+        context = {
+            "invoice_number": invoice.invoice_number,
+            "customer_name": invoice.customer.name,
+            "total_amount": float(invoice.total_amount),
+            "balance_due": float(invoice.balance_due) if invoice.balance_due else 0,
+            "due_date": invoice.due_date.isoformat() if invoice.due_date else None,
+            "days_overdue": days_overdue,
+            "payment_terms": invoice.payment_terms,
+        }
+        return COLLECTIONS_SYSTEM_PROMPT, f"Tone: {tone}\nDraft collections email for: {prompt_json(context)}"
+
+    def _collections_result(self, invoice: Invoice, days_overdue: int, content: str) -> Dict[str, Any]:
+        """Shape a collections email draft into the response dict."""
+        return {
+            "invoice_number": invoice.invoice_number,
+            "customer_name": invoice.customer.name,
+            "days_overdue": days_overdue,
+            "email_draft": content,
+            "generated_at": utc_now_iso(),
+        }
+
     async def draft_collections_email(
         self,
         invoice: Invoice,
@@ -139,44 +474,72 @@ class DisputeAgent(BaseAgent):
     ) -> Dict[str, Any]:
         """Draft collection email for overdue invoice."""
         try:
-            if days_overdue <= 7:
-                tone = "friendly reminder"
-            elif days_overdue <= 30:
-                tone = "polite but urgent"
-            else:
-                tone = "formal and serious"
-
-            context = {
-                "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
-                "total_amount": float(invoice.total_amount),
-                "balance_due": float(invoice.balance_due) if invoice.balance_due else 0,
-                "due_date": invoice.due_date.isoformat() if invoice.due_date else None,
-                "days_overdue": days_overdue,
-                "payment_terms": invoice.payment_terms,
-            }
+            system_message, human_message = self._collections_prompt(invoice, days_overdue)
             content = await self._invoke_llm(
-                system_message=f"""You are a professional accounts receivable specialist.
-                Draft a {tone} collections email. Be professional, state the amount owed,
-                include payment options, and set clear expectations. Tone: {tone}.
-                Format as a complete email with subject line.""",
-                human_message=f"Draft collections email for: {context}",
+                system_message=system_message,
+                human_message=human_message,
                 log_message=(
                     f"Generated collections email for invoice {invoice.invoice_number}, "
                     f"{days_overdue} days overdue"
                 ),
             )
-            return {
-                "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
-                "days_overdue": days_overdue,
-                "email_draft": content,
-                "generated_at": datetime.utcnow().isoformat(),
-            }
+            return self._collections_result(invoice, days_overdue, content)
         except Exception as e:
-            logger.error(f"Error drafting collections email: {e}")
+            logger.error("Error drafting collections email: %s", e)
             return {"error": str(e)}
 
+    async def stream_collections_email(
+        self,
+        invoice: Invoice,
+        days_overdue: int,
+    ) -> AsyncIterator[str]:
+        """Stream a collections email draft for an overdue invoice as it is generated."""
+        system_message, human_message = self._collections_prompt(invoice, days_overdue)
+        async for text in self._stream_llm(system_message, human_message):
+            yield text
+        logger.info(
+            "Streamed collections email for invoice %s, %d days overdue",
+            invoice.invoice_number, days_overdue,
+        )
+
+    async def draft_collections_emails(
+        self,
+        items: List[Tuple[Invoice, int]],
+        use_batch_api: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Draft collections emails for many (invoice, days_overdue) pairs.
+
+        By default the prompts run concurrently, bounded by llm_max_concurrency.
+        Offline jobs such as the nightly collections run can pass use_batch_api
+        to submit them as one Message Batch instead (half price, but results can
+        take hours).
+        """
+        if not use_batch_api:
+            return await self._gather_bounded(
+                self.draft_collections_email(invoice, days_overdue)
+                for invoice, days_overdue in items
+            )
+
+        try:
+            prompts = {
+                f"{i}-{invoice.id}": self._collections_prompt(invoice, days_overdue)
+                for i, (invoice, days_overdue) in enumerate(items)
+            }
+            contents = await self._invoke_llm_batch(prompts)
+        except Exception as e:
+            logger.error("Error drafting collections emails in batch: %s", e)
+            return [{"error": str(e)} for _ in items]
+
+        results = []
+        for i, (invoice, days_overdue) in enumerate(items):
+            content = contents.get(f"{i}-{invoice.id}")
+            if content is None:
+                results.append({"error": "Batch request failed", "invoice_number": invoice.invoice_number})
+            else:
+                results.append(self._collections_result(invoice, days_overdue, content))
+        logger.info("Generated %d collections emails via batch API", len(items))
+        return results
+
     async def suggest_resolution(
         self,
         invoice: Invoice,
@@ -184,52 +547,87 @@ class DisputeAgent(BaseAgent):
     ) -> Dict[str, Any]:
         """Suggest resolution for customer complaint."""
         try:
+            customer_name = invoice.customer.name
             context = {
                 "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
+                "customer_name": customer_name,
                 "invoice_amount": float(invoice.total_amount),
-                "complaint": customer_complaint,
-                "charges": _charge_brief(invoice),
+                "complaint": _normalize_message(customer_complaint),
+                "charges": _charge_brief(self._charges_for(invoice)),
             }
             content = await self._invoke_llm(
-                system_message="""You are a customer service manager and conflict resolution expert.
-                Suggest the best resolution: write-off amount, credit to apply, revised invoice,
-                or process improvements. Balance customer satisfaction with company revenue.
-                Be specific and actionable.""",
-                human_message=f"Suggest resolution for: {context}",
+                system_message=RESOLUTION_SYSTEM_PROMPT,
+                human_message=f"Suggest resolution for: {prompt_json(context)}",
                 log_message=f"Generated resolution suggestion for invoice {invoice.invoice_number}",
             )
             return {
                 "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
+                "customer_name": customer_name,
                 "complaint": customer_complaint,
                 "suggested_resolution": content,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": utc_now_iso(),
             }
         except Exception as e:
-            logger.error(f"Error suggesting resolution: {e}")
+            logger.error("Error suggesting resolution: %s", e)
             return {"error": str(e)}
 
     async def analyze_dispute_sentiment(self, customer_message: str) -> Dict[str, Any]:
-        """Analyze sentiment and urgency of customer dispute message."""
+        """Analyze sentiment and urgency of customer dispute message.
+
+        Messages that explicitly threaten legal or payment action ("will sue",
+        "take legal action", "file a chargeback") are flagged as
+        threatening/critical by a regex prescreen without calling the LLM.
+        Single words such as "attorney" or "cancel" are only passed to the LLM
+        as hints, since they also appear in benign messages.
+        """
         try:
-            content = await self._invoke_llm(
-                system_message="""You are a sentiment analysis expert.
-                Determine sentiment (positive/neutral/frustrated/angry/threatening),
-                urgency (low/medium/high/critical), key concerns, and tone indicators.
-                Return JSON: {"sentiment","urgency","key_concerns","tone_indicators","recommended_response_time"}""",
-                human_message=f"Analyze this customer message:\n\n{customer_message}",
+            threats = sorted({m.lower() for m in _THREAT_RE.findall(customer_message)})
+            if threats:
+                logger.info("Threatening dispute message detected by prescreen")
+                return {
+                    "customer_message": customer_message,
+                    "sentiment_analysis": SentimentAnalysis(
+                        sentiment=DisputeSentiment.THREATENING,
+                        urgency="critical",
+                        key_concerns=threats,
+                        tone_indicators=["explicit legal or payment threat"],
+                        recommended_response_time="same business day",
+                    ).model_dump(mode="json"),
+                    "analyzed_at": utc_now_iso(),
+                }
+            human_message = f"Analyze this customer message:\n\n{_normalize_message(customer_message)}"
+            hints = sorted({m.lower() for m in _THREAT_HINT_RE.findall(customer_message)})
+            if hints:
+                human_message += f"\n\nPossible threat terms, judge them in context: {', '.join(hints)}"
+            parsed = await self._invoke_llm_structured(
+                system_message=SENTIMENT_SYSTEM_PROMPT,
+                human_message=human_message,
+                schema=SentimentAnalysis,
                 log_message="Analyzed customer dispute sentiment",
+                cache_ttl=SENTIMENT_CACHE_TTL,
+                max_tokens=CLASSIFICATION_MAX_TOKENS,
+                temperature=CLASSIFICATION_TEMPERATURE,
             )
             return {
                 "customer_message": customer_message,
-                "sentiment_analysis": content,
-                "analyzed_at": datetime.utcnow().isoformat(),
+                "sentiment_analysis": parsed.model_dump(mode="json"),
+                "analyzed_at": utc_now_iso(),
             }
         except Exception as e:
-            logger.error(f"Error analyzing sentiment: {e}")
+            logger.error("Error analyzing sentiment: %s", e)
             return {"error": str(e)}
 
+    async def analyze_sentiments_bulk(
+        self,
+        customer_messages: List[str],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Analyze sentiment for many messages concurrently, bounded by max_concurrency."""
+        return await self._gather_bounded(
+            (self.analyze_dispute_sentiment(message) for message in customer_messages),
+            max_concurrency,
+        )
+
     async def categorize_dispute(
         self,
         dispute_description: str,
@@ -237,28 +635,82 @@ class DisputeAgent(BaseAgent):
     ) -> Dict[str, Any]:
         """Categorize the type of dispute."""
         try:
-            context: Dict[str, Any] = {"dispute_description": dispute_description}
+            context: Dict[str, Any] = {"dispute_description": _normalize_message(dispute_description)}
             if invoice:
                 context["invoice_amount"] = float(invoice.total_amount)
-                context["charges"] = _charge_brief(invoice)
+                context["charges"] = _summarize_charges(self._charges_for(invoice))
 
-            categories_list = [cat.value for cat in DisputeCategory]
-            content = await self._invoke_llm(
-                system_message=f"""You are a billing dispute categorization expert.
-                Categorize into one of: {', '.join(categories_list)}.
-                Provide primary category, confidence (0-1), secondary categories, and reasoning.""",
-                human_message=f"Categorize this dispute:\n\n{context}",
+            parsed = await self._invoke_llm_structured(
+                system_message=CATEGORIZATION_SYSTEM_PROMPT,
+                human_message=f"Categorize this dispute:\n\n{prompt_json(context)}",
+                schema=DisputeCategorization,
                 log_message="Categorized dispute",
+                cache_ttl=CATEGORIZATION_CACHE_TTL,
+                max_tokens=CLASSIFICATION_MAX_TOKENS,
+                temperature=CLASSIFICATION_TEMPERATURE,
             )
             return {
                 "dispute_description": dispute_description,
-                "categorization": content,
-                "timestamp": datetime.utcnow().isoformat(),
+                "categorization": parsed.model_dump(mode="json"),
+                "timestamp": utc_now_iso(),
             }
         except Exception as e:
-            logger.error(f"Error categorizing dispute: {e}")
+            logger.error("Error categorizing dispute: %s", e)
             return {"error": str(e)}
 
+    async def categorize_disputes_bulk(
+        self,
+        dispute_descriptions: List[str],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Categorize many disputes concurrently, bounded by max_concurrency."""
+        return await self._gather_bounded(
+            (self.categorize_dispute(description) for description in dispute_descriptions),
+            max_concurrency,
+        )
+
+    async def triage_dispute(
+        self,
+        customer_message: str,
+        invoice: Optional[Invoice] = None,
+    ) -> Dict[str, Any]:
+        """Analyze sentiment and categorize a dispute in a single LLM call."""
+        try:
+            context: Dict[str, Any] = {"customer_message": _normalize_message(customer_message)}
+            if invoice:
+                context["invoice_amount"] = float(invoice.total_amount)
+                context["charges"] = _summarize_charges(self._charges_for(invoice))
+
+            parsed = await self._invoke_llm_structured(
+                system_message=TRIAGE_SYSTEM_PROMPT,
+                human_message=f"Triage this dispute:\n\n{prompt_json(context)}",
+                schema=DisputeTriage,
+                log_message="Triaged customer dispute",
+                cache_ttl=SENTIMENT_CACHE_TTL,
+                max_tokens=2 * CLASSIFICATION_MAX_TOKENS,
+                temperature=CLASSIFICATION_TEMPERATURE,
+            )
+            triage = parsed.model_dump(mode="json")
+            return {
+                "customer_message": customer_message,
+                "sentiment_analysis": triage.get("sentiment_analysis"),
+                "categorization": triage.get("categorization"),
+                "analyzed_at": utc_now_iso(),
+            }
+        except Exception as e:
+            logger.error("Error triaging dispute: %s", e)
+            return {"error": str(e)}
+
+    def _summary_prompt(self, invoice: Invoice, customer_messages: List[str]) -> str:
+        """Build the human prompt for a dispute summary."""
+        context = {
+            "invoice_number": invoice.invoice_number,
+            "customer_name": invoice.customer.name,
+            "invoice_amount": float(invoice.total_amount),
+            "messages": _recent_messages(customer_messages),
+        }
+        return f"Summarize this dispute case:\n\n{prompt_json(context)}"
+
     async def generate_dispute_summary(
         self,
         invoice: Invoice,
@@ -266,17 +718,9 @@ class DisputeAgent(BaseAgent):
     ) -> Dict[str, Any]:
         """Generate executive summary of dispute conversation."""
         try:
-            context = {
-                "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
-                "invoice_amount": float(invoice.total_amount),
-                "messages": customer_messages,
-            }
             content = await self._invoke_llm(
-                system_message="""You are an executive assistant summarizing dispute cases.
-                Create a concise summary (<200 words) covering: key facts, customer concerns,
-                current status, recommended actions, and risk level (low/medium/high).""",
-                human_message=f"Summarize this dispute case:\n\n{context}",
+                system_message=SUMMARY_SYSTEM_PROMPT,
+                human_message=self._summary_prompt(invoice, customer_messages),
                 log_message=f"Generated dispute summary for invoice {invoice.invoice_number}",
             )
             return {
@@ -284,12 +728,34 @@ class DisputeAgent(BaseAgent):
                 "customer_name": invoice.customer.name,
                 "executive_summary": content,
                 "messages_reviewed": len(customer_messages),
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
             }
         except Exception as e:
-            logger.error(f"Error generating dispute summary: {e}")
+            logger.error("Error generating dispute summary: %s", e)
             return {"error": str(e)}
 
+    async def generate_dispute_summaries(
+        self,
+        items: List[Tuple[Invoice, List[str]]],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Summarize many (invoice, customer_messages) dispute cases concurrently."""
+        return await self._gather_bounded(
+            (self.generate_dispute_summary(invoice, messages) for invoice, messages in items),
+            max_concurrency,
+        )
+
+    async def stream_dispute_summary(
+        self,
+        invoice: Invoice,
+        customer_messages: List[str],
+    ) -> AsyncIterator[str]:
+        """Stream an executive summary of a dispute conversation as it is generated."""
+        human_message = self._summary_prompt(invoice, customer_messages)
+        async for text in self._stream_llm(SUMMARY_SYSTEM_PROMPT, human_message):
+            yield text
+        logger.info("Streamed dispute summary for invoice %s", invoice.invoice_number)
+
     async def calculate_goodwill_credit(
         self,
         invoice: Invoice,
@@ -298,28 +764,82 @@ class DisputeAgent(BaseAgent):
     ) -> Dict[str, Any]:
         """Calculate recommended goodwill credit amount."""
         try:
+            customer_name = invoice.customer.name
+            rule_credit = self._goodwill_rule_check(
+                float(invoice.total_amount), customer_complaint, customer_lifetime_value
+            )
+            if rule_credit is not None:
+                logger.info(
+                    "Rule-based goodwill credit for invoice %s: $%.2f",
+                    invoice.invoice_number, rule_credit,
+                )
+                return {
+                    "invoice_number": invoice.invoice_number,
+                    "customer_name": customer_name,
+                    "goodwill_recommendation": (
+                        f"Decided by deterministic goodwill rules: offer a ${rule_credit:.2f} "
+                        "credit for a minor service issue."
+                    ),
+                    "recommended_credit": rule_credit,
+                    "calculated_at": utc_now_iso(),
+                }
+
             context = {
                 "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
+                "customer_name": customer_name,
                 "invoice_amount": float(invoice.total_amount),
                 "complaint": customer_complaint,
                 "customer_lifetime_value": customer_lifetime_value,
             }
             content = await self._invoke_llm(
-                system_message="""You are a customer retention specialist.
-                Recommend a goodwill credit: specific dollar amount or percentage, justification,
-                how to present it, and any additional gestures. Balance satisfaction with profitability.""",
-                human_message=f"Calculate goodwill credit for:\n\n{context}",
+                system_message=GOODWILL_SYSTEM_PROMPT,
+                human_message=f"Calculate goodwill credit for:\n\n{prompt_json(context)}",
                 log_message=(
                     f"Calculated goodwill credit recommendation for invoice {invoice.invoice_number}"
                 ),
             )
             return {
                 "invoice_number": invoice.invoice_number,
-                "customer_name": invoice.customer.name,
+                "customer_name": customer_name,
                 "goodwill_recommendation": content,
-                "calculated_at": datetime.utcnow().isoformat(),
+                "calculated_at": utc_now_iso(),
             }
         except Exception as e:
-            logger.error(f"Error calculating goodwill credit: {e}")
+            logger.error("Error calculating goodwill credit: %s", e)
             return {"error": str(e)}
+
+    def _goodwill_rule_check(
+        self,
+        invoice_amount: float,
+        customer_complaint: str,
+        customer_lifetime_value: Optional[float],
+    ) -> Optional[float]:
+        """Price clear-cut minor complaints without the LLM; None means ambiguous."""
+        if not customer_lifetime_value or customer_lifetime_value <= 0:
+            return None
+        if _minor_complaint_confidence(customer_complaint) <= GOODWILL_RULE_MIN_CONFIDENCE:
+            return None
+        return round(
+            min(invoice_amount * GOODWILL_MINOR_RATE, customer_lifetime_value * GOODWILL_CLV_CAP_RATE),
+            2,
+        )
+
+
+def _minor_complaint_confidence(complaint: str) -> float:
+    """Score how confidently a complaint reads as a minor service issue, from 0 to 1.
+
+    Severe wording or any dollar figure above GOODWILL_MINOR_AMOUNT_CAP scores
+    0. Vague words like "late" or "delay" only count when the complaint also
+    cites a small amount, since they describe detention and demurrage disputes
+    just as often as minor slips.
+    """
+    if _SEVERE_COMPLAINT_RE.search(complaint):
+        return 0.0
+    amounts = [float(m.replace(",", "")) for m in _DOLLAR_AMOUNT_RE.findall(complaint)]
+    if any(amount > GOODWILL_MINOR_AMOUNT_CAP for amount in amounts):
+        return 0.0
+    if _MINOR_COMPLAINT_RE.search(complaint):
+        return 0.95 if amounts else 0.9
+    if _VAGUE_COMPLAINT_RE.search(complaint):
+        return 0.9 if amounts else 0.5
+    return 0.0
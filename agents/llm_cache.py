@@ -0,0 +1,93 @@
+"""Response caches for LLM calls."""
+import asyncio
+import logging
+import time
+import weakref
+from typing import Dict, Optional, Protocol, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+REDIS_KEY_PREFIX = "llm:"
+
+
+class LLMCache(Protocol):
+    """Async key/value store for LLM response text."""
+
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+
+class MemoryLLMCache:
+    """In-process TTL cache evicting the oldest entry when full."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class RedisLLMCache:
+    """Redis-backed cache shared across workers; Redis errors are treated as misses.
+
+    A redis.asyncio connection pool is bound to the event loop it first runs
+    on, so a client is created lazily for each running loop (every asyncio.run
+    in a sync caller gets its own).
+    """
+
+    def __init__(self, url: str):
+        self._url = url
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Redis]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _redis(self) -> Redis:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = Redis.from_url(self._url, decode_responses=True)
+        return client
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self._redis().get(REDIS_KEY_PREFIX + key)
+        except RedisError as e:
+            logger.warning("LLM cache get failed: %s", e)
+            return None
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        try:
+            await self._redis().set(REDIS_KEY_PREFIX + key, value, ex=ttl)
+        except RedisError as e:
+            logger.warning("LLM cache set failed: %s", e)
+
+
+def create_llm_cache(max_entries: int = 1024) -> LLMCache:
+    """Build the response cache selected by settings.llm_cache_backend."""
+    if settings.llm_cache_backend == "redis":
+        return RedisLLMCache(settings.redis_url)
+    return MemoryLLMCache(max_entries)
@@ -1,29 +1,103 @@
 """AI Agent for container tracking automation."""
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import cached_property
+from operator import attrgetter
 from typing import List, Dict, Optional, Any
 
+from pydantic import BaseModel
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from models import Container, Load, Customer, ContainerEvent
-from integrations.terminal49_client import Terminal49Client
+from integrations.terminal49_client import Terminal49Client, Terminal49Container, get_client
 from services.alert_service import AlertService
 from services.charge_calculator import ChargeCalculator
-from agents.base_agent import BaseAgent
+from repositories.container_repository import ContainerRepository
+from agents.base_agent import BaseAgent, prompt_json
 from config import get_settings
+from utils.date_helpers import utc_now_iso
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+PREPULL_DECISION_CACHE_TTL = 7 * 24 * 3600
+PREPULL_DECISION_MAX_TOKENS = 200
+RISK_ANALYSIS_CACHE_TTL = 300
+RISK_BATCH_SIZE = 25
+RISK_BATCH_MAX_TOKENS = 4096
+
+RISK_ANALYSIS_SYSTEM_PROMPT = """You are an expert in intermodal trucking and container logistics.
+Assess risk for per diem, demurrage, and detention charges based on container status,
+time elapsed since milestones, holds, and free time remaining.
+Provide a risk level (low/medium/high/critical) and specific recommendations."""
+
+RISK_BATCH_SYSTEM_PROMPT = RISK_ANALYSIS_SYSTEM_PROMPT + """
+You will receive a JSON array of containers. Return one assessment per container,
+identified by its container_number."""
+
+PREPULL_SYSTEM_PROMPT = """You are an expert logistics analyst specializing in cost optimization.
+Decide whether pre-pulling this container makes financial sense.
+Consider pre-pull fee vs per diem savings, days until charges start, location, and delay risk."""
+
+PREPULL_STREAM_SYSTEM_PROMPT = PREPULL_SYSTEM_PROMPT + "\nStart your answer with YES or NO."
+
+
+class PrepullDecision(BaseModel):
+    """Pre-pull recommendation for a container."""
+    recommend_prepull: bool
+    reasoning: str
+    confidence: float
+
+
+class ContainerRisk(BaseModel):
+    """Charge risk assessment for one container."""
+    container_number: str
+    risk_level: str
+    recommendations: List[str]
+
+
+class ContainerRiskBatch(BaseModel):
+    """Charge risk assessments for a batch of containers."""
+    assessments: List[ContainerRisk]
+
+
+RISK_FIELDS = (
+    "container_number",
+    "current_status",
+    "location",
+    "vessel_discharged",
+    "available_for_pickup",
+    "picked_up",
+    "delivered",
+    "returned_empty",
+    "last_free_day",
+    "per_diem_days",
+    "demurrage_days",
+    "holds",
+)
+_get_risk_fields = attrgetter(*RISK_FIELDS)
+
+
+def _risk_data(container: Container) -> Dict[str, Any]:
+    """Container fields the risk prompts are built from."""
+    return dict(zip(RISK_FIELDS, _get_risk_fields(container)))
+
 
 class TrackingAgent(BaseAgent):
     """AI Agent for monitoring and tracking containers."""
 
     def __init__(self, db: Session):
         super().__init__(db, temperature=settings.llm_temperature_default)
-        self.terminal49 = Terminal49Client()
-        self.alert_service = AlertService(db)
-        self.charge_calculator = ChargeCalculator(db)
+        self.terminal49: Terminal49Client = get_client()
+
+    @cached_property
+    def alert_service(self) -> AlertService:
+        return AlertService(self.db)
+
+    @cached_property
+    def charge_calculator(self) -> ChargeCalculator:
+        return ChargeCalculator(self.db)
     
     async def start_tracking_container(
         self,
@@ -32,11 +106,7 @@ class TrackingAgent(BaseAgent):
     ) -> Optional[Container]:
         """Start tracking a container via Terminal49 and persist it."""
         try:
-            existing = (
-                self.db.query(Container)
-                .filter(Container.container_number == container_number)
-                .first()
-            )
+            existing = ContainerRepository(self.db).get_by_container_number(container_number)
             
             if existing:
                 logger.info(f"Already tracking container {container_number}")
@@ -85,31 +155,34 @@ class TrackingAgent(BaseAgent):
                 container.last_free_day = last_free_day
                 container.per_diem_starts = last_free_day
             
-            self.db.commit()
+            self.db.flush()
             
             if t49_container.milestones:
-                for milestone in t49_container.milestones:
-                    event = ContainerEvent(
-                        container_id=container.id,
-                        event_type=milestone.event_type,
-                        event_time=milestone.event_time,
-                        location=milestone.location,
-                        vessel=milestone.vessel,
-                        voyage=milestone.voyage,
-                        description=milestone.description,
-                        raw_data=milestone.raw_data,
-                    )
-                    self.db.add(event)
-                
-                self.db.commit()
-            
-            logger.info(f"Started tracking container {container_number}")
+                self.db.execute(
+                    insert(ContainerEvent),
+                    [
+                        {
+                            "container_id": container.id,
+                            "event_type": milestone.event_type,
+                            "event_time": milestone.event_time,
+                            "location": milestone.location,
+                            "vessel": milestone.vessel,
+                            "voyage": milestone.voyage,
+                            "description": milestone.description,
+                            "raw_data": milestone.raw_data,
+                        }
+                        for milestone in t49_container.milestones
+                    ],
+                )
             
             if container.available_for_pickup:
                 self.alert_service.create_container_available_alert(
-                    container, customer
+                    container, customer, commit=False
                 )
             
+            self.db.commit()
+            
+            logger.info(f"Started tracking container {container_number}")
             return container
             
         except Exception as e:
@@ -135,19 +208,7 @@ class TrackingAgent(BaseAgent):
                 logger.error(f"Failed to get status for container {container.id}")
                 return False
             
-            container.current_status = t49_container.current_status
-            container.location = t49_container.location
-            container.vessel_departed_pol = t49_container.vessel_departed_pol
-            container.vessel_arrived_pod = t49_container.vessel_arrived_pod
-            container.vessel_discharged = t49_container.vessel_discharged
-            container.available_for_pickup = t49_container.available_for_pickup
-            container.picked_up = t49_container.picked_up
-            container.delivered = t49_container.delivered
-            container.returned_empty = t49_container.returned_empty
-            container.holds = t49_container.holds
-            container.last_updated = datetime.utcnow()
-            container.raw_terminal49_data = t49_container.raw_data
-            
+            self._apply_status(container, t49_container, datetime.now(timezone.utc))
             self.db.commit()
             
             logger.info(f"Updated container {container.container_number} status: {container.current_status}")
@@ -157,9 +218,54 @@ class TrackingAgent(BaseAgent):
             logger.error(f"Error updating container {container.id}: {e}")
             self.db.rollback()
             return False
+
+    async def update_container_statuses(self, containers: List[Container]) -> int:
+        """Update many containers from Terminal49 in one transaction; return count updated."""
+        tracked = [c for c in containers if c.terminal49_tracking_id]
+        statuses = await self.terminal49.get_container_statuses(
+            [c.terminal49_tracking_id for c in tracked]
+        )
+        now = datetime.now(timezone.utc)
+        updated = 0
+        for container in tracked:
+            t49_container = statuses.get(container.terminal49_tracking_id)
+            if t49_container:
+                self._apply_status(container, t49_container, now)
+                updated += 1
+
+        try:
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Error saving container status updates: {e}")
+            self.db.rollback()
+            return 0
+
+        logger.info(f"Updated {updated} of {len(containers)} container statuses")
+        return updated
+
+    def _apply_status(self, container: Container, t49_container: Terminal49Container, now: datetime) -> None:
+        """Copy Terminal49 status fields onto container; now is an aware UTC datetime."""
+        container.current_status = t49_container.current_status
+        container.location = t49_container.location
+        container.vessel_departed_pol = t49_container.vessel_departed_pol
+        container.vessel_arrived_pod = t49_container.vessel_arrived_pod
+        container.vessel_discharged = t49_container.vessel_discharged
+        container.available_for_pickup = t49_container.available_for_pickup
+        container.picked_up = t49_container.picked_up
+        container.delivered = t49_container.delivered
+        container.returned_empty = t49_container.returned_empty
+        container.holds = t49_container.holds
+        container.last_updated = now.replace(tzinfo=None)  # column stores naive UTC
+        container.raw_terminal49_data = t49_container.raw_data
     
-    def check_alerts(self, container: Container) -> List[str]:
-        """Check if alerts should be sent for container."""
+    def check_alerts(self, container: Container, flush: bool = True) -> List[str]:
+        """Create alerts that should be sent for container.
+
+        With flush=False the alerts are only queued and are lost unless the
+        caller runs alert_service.flush(); a poll cycle over many containers
+        does that once at the end to commit once. Callers checking many
+        containers should eager-load container.load.customer.
+        """
         try:
             alerts = []
             
@@ -171,7 +277,7 @@ class TrackingAgent(BaseAgent):
             if self.charge_calculator.should_alert_per_diem(
                 container, customer, hours_threshold=24
             ):
-                self.alert_service.create_per_diem_alert(
+                self.alert_service.queue_per_diem_alert(
                     container, customer, hours_until=24
                 )
                 alerts.append("Per diem alert created")
@@ -181,7 +287,7 @@ class TrackingAgent(BaseAgent):
                     container, customer
                 )
                 if per_diem_days > 0:
-                    self.alert_service.create_charge_accruing_alert(
+                    self.alert_service.queue_charge_accruing_alert(
                         container,
                         customer,
                         "per_diem",
@@ -189,6 +295,8 @@ class TrackingAgent(BaseAgent):
                     )
                     alerts.append(f"Per diem accruing: {per_diem_days} days")
             
+            if flush:
+                self.alert_service.flush()
             return alerts
             
         except Exception as e:
@@ -196,79 +304,143 @@ class TrackingAgent(BaseAgent):
             return []
     
     async def analyze_container_risk(self, container: Container) -> Dict[str, Any]:
-        """Use AI to analyze container for charge risk."""
+        """Use AI to analyze container for charge risk.
+
+        Analyses are cached for RISK_ANALYSIS_CACHE_TTL seconds, keyed on the
+        prompt, so repeat requests for an unchanged container skip the LLM.
+        """
         try:
-            container_data = {
-                "container_number": container.container_number,
-                "current_status": container.current_status,
-                "location": container.location,
-                "vessel_discharged": container.vessel_discharged.isoformat() if container.vessel_discharged else None,
-                "available_for_pickup": container.available_for_pickup.isoformat() if container.available_for_pickup else None,
-                "picked_up": container.picked_up.isoformat() if container.picked_up else None,
-                "delivered": container.delivered.isoformat() if container.delivered else None,
-                "returned_empty": container.returned_empty.isoformat() if container.returned_empty else None,
-                "last_free_day": container.last_free_day.isoformat() if container.last_free_day else None,
-                "per_diem_days": container.per_diem_days,
-                "demurrage_days": container.demurrage_days,
-                "holds": container.holds,
-            }
             content = await self._invoke_llm(
-                system_message="""You are an expert in intermodal trucking and container logistics.
-                Assess risk for per diem, demurrage, and detention charges based on container status,
-                time elapsed since milestones, holds, and free time remaining.
-                Provide a risk level (low/medium/high/critical) and specific recommendations.""",
-                human_message=f"Analyze this container: {container_data}",
+                system_message=RISK_ANALYSIS_SYSTEM_PROMPT,
+                human_message=f"Analyze this container: {prompt_json(_risk_data(container))}",
+                cache_ttl=RISK_ANALYSIS_CACHE_TTL,
                 log_message=f"AI analysis completed for container {container.container_number}",
             )
             return {
                 "container_number": container.container_number,
                 "analysis": content,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": utc_now_iso(),
             }
         except Exception as e:
             logger.error(f"Error analyzing container risk: {e}")
             return {"error": str(e), "container_number": container.container_number}
 
+    async def analyze_container_risks(self, containers: List[Container]) -> List[Dict[str, Any]]:
+        """Analyze charge risk for many containers, RISK_BATCH_SIZE per LLM call.
+
+        Results are returned in the order of containers; a container the model
+        skipped, or whose batch failed, gets an error entry.
+        """
+        batches = [
+            containers[i:i + RISK_BATCH_SIZE]
+            for i in range(0, len(containers), RISK_BATCH_SIZE)
+        ]
+        results = await self._gather_bounded(self._analyze_risk_batch(batch) for batch in batches)
+        return [result for batch_results in results for result in batch_results]
+
+    async def _analyze_risk_batch(self, containers: List[Container]) -> List[Dict[str, Any]]:
+        try:
+            parsed = await self._invoke_llm_structured(
+                system_message=RISK_BATCH_SYSTEM_PROMPT,
+                human_message=f"Analyze these containers: {prompt_json([_risk_data(c) for c in containers])}",
+                schema=ContainerRiskBatch,
+                cache_ttl=RISK_ANALYSIS_CACHE_TTL,
+                log_message=f"AI analysis completed for {len(containers)} containers",
+                max_tokens=RISK_BATCH_MAX_TOKENS,
+            )
+        except Exception as e:
+            logger.error(f"Error analyzing container risk batch: {e}")
+            return [{"error": str(e), "container_number": c.container_number} for c in containers]
+
+        assessments = {a.container_number: a for a in parsed.assessments}
+        timestamp = utc_now_iso()
+        results = []
+        for container in containers:
+            assessment = assessments.get(container.container_number)
+            if assessment is None:
+                results.append({"error": "No assessment returned", "container_number": container.container_number})
+            else:
+                results.append({**assessment.model_dump(), "timestamp": timestamp})
+        return results
+
     async def should_prepull_container(
         self,
         container: Container,
         customer: Customer,
+        include_reasoning: bool = True,
     ) -> Dict[str, Any]:
-        """AI decision: Should we pre-pull this container?"""
+        """AI decision: Should we pre-pull this container?
+
+        The decision is returned as a structured PrepullDecision tool call. With
+        include_reasoning=False the model response is instead streamed and cut
+        off after the leading YES/NO, and no reasoning is returned.
+        """
         try:
             days_until_last_free = (
-                (container.last_free_day - datetime.utcnow().date()).days
-                if container.last_free_day else 0
+                (container.last_free_day - datetime.now(timezone.utc).date()).days
+                if container.last_free_day else None
             )
             prepull_cost = customer.pre_pull_fee or 75.0
             per_diem_rate = customer.per_diem_rate or settings.default_per_diem_rate
             estimated_savings = per_diem_rate * max(0, 3) - prepull_cost  # estimate 3 days saved
 
+            rule_decision = self._prepull_rule_check(
+                container, days_until_last_free, estimated_savings
+            )
+            if rule_decision is not None:
+                recommendation = "YES" if rule_decision else "NO"
+                logger.info(f"Rule-based pre-pull decision for {container.container_number}: {recommendation}")
+                return {
+                    "container_number": container.container_number,
+                    "recommendation": recommendation,
+                    "reasoning": "Decided by deterministic pre-pull rules",
+                    "estimated_savings": estimated_savings,
+                    "timestamp": utc_now_iso(),
+                }
+
             decision_data = {
                 "container_number": container.container_number,
                 "location": container.location,
-                "available_for_pickup": container.available_for_pickup.isoformat() if container.available_for_pickup else None,
+                "available_for_pickup": container.available_for_pickup,
                 "days_until_last_free": days_until_last_free,
                 "prepull_cost": prepull_cost,
                 "potential_per_diem_per_day": per_diem_rate,
                 "estimated_savings": estimated_savings,
             }
-            content = await self._invoke_llm(
-                system_message="""You are an expert logistics analyst specializing in cost optimization.
-                Decide whether pre-pulling this container makes financial sense.
-                Consider pre-pull fee vs per diem savings, days until charges start, location, and delay risk.
-                Provide a clear YES or NO decision with detailed reasoning.""",
-                human_message=f"Should we pre-pull this container? {decision_data}",
+            human_message = f"Should we pre-pull this container? {prompt_json(decision_data)}"
+            if not include_reasoning:
+                decision = await self._stream_llm_decision(
+                    PREPULL_STREAM_SYSTEM_PROMPT,
+                    human_message,
+                    choices=("YES", "NO"),
+                )
+                recommendation = decision or "NO"
+                logger.info(f"Pre-pull decision for {container.container_number}: {recommendation}")
+                return {
+                    "container_number": container.container_number,
+                    "recommendation": recommendation,
+                    "reasoning": None,
+                    "estimated_savings": estimated_savings,
+                    "timestamp": utc_now_iso(),
+                }
+
+            decision = await self._invoke_llm_structured(
+                system_message=PREPULL_SYSTEM_PROMPT,
+                human_message=human_message,
+                schema=PrepullDecision,
                 log_message=f"Pre-pull decision generated for {container.container_number}",
+                cache_ttl=PREPULL_DECISION_CACHE_TTL,
+                max_tokens=PREPULL_DECISION_MAX_TOKENS,
             )
-            recommendation = "YES" if "YES" in content.upper()[:50] else "NO"
+            recommendation = "YES" if decision.recommend_prepull else "NO"
             logger.info(f"Pre-pull decision for {container.container_number}: {recommendation}")
             return {
                 "container_number": container.container_number,
                 "recommendation": recommendation,
-                "reasoning": content,
+                "reasoning": decision.reasoning,
+                "confidence": decision.confidence,
                 "estimated_savings": estimated_savings,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": utc_now_iso(),
             }
         except Exception as e:
             logger.error(f"Error making pre-pull decision: {e}")
@@ -278,3 +450,25 @@ class TrackingAgent(BaseAgent):
                 "recommendation": "ERROR",
             }
 
+    def _prepull_rule_check(
+        self,
+        container: Container,
+        days_until_last_free: Optional[int],
+        estimated_savings: float,
+    ) -> Optional[bool]:
+        """Decide clear-cut pre-pull cases without the LLM; None means ambiguous.
+
+        An unknown last free day is ambiguous unless the container cannot or
+        need not be pre-pulled at all.
+        """
+        if container.picked_up or not container.available_for_pickup:
+            return False
+        if estimated_savings <= 0:
+            return False
+        if container.holds or days_until_last_free is None:
+            return None
+        if days_until_last_free <= 1:
+            return True
+        if days_until_last_free >= 5:
+            return False
+        return None
@@ -0,0 +1,93 @@
+"""Add charges.idempotency_key with a unique constraint
+
+Billing inserts charges with ON CONFLICT (idempotency_key) DO NOTHING, so the
+constraint must exist on databases created before it was added to the model.
+Uninvoiced duplicate charges are removed first, keeping an invoiced row or
+else the oldest one; invoiced duplicates must be resolved by hand.
+
+Revision ID: 5b2f8c1d9e47
+Revises:
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2f8c1d9e47'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("charges"):
+        return  # init_db creates the table with the constraint
+    if "idempotency_key" in {column["name"] for column in inspector.get_columns("charges")}:
+        return
+
+    op.add_column("charges", sa.Column("idempotency_key", sa.String(length=100), nullable=True))
+    if op.get_bind().dialect.name == "postgresql":
+        _backfill_postgresql()
+    else:
+        _backfill_generic()
+    with op.batch_alter_table("charges") as batch_op:
+        batch_op.alter_column("idempotency_key", existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_unique_constraint("uq_charges_idempotency_key", ["idempotency_key"])
+
+
+def _backfill_postgresql() -> None:
+    op.execute(
+        """
+        UPDATE charges
+        SET idempotency_key = load_id || ':' || lower(CAST(charge_type AS TEXT)) || ':'
+            || COALESCE(to_char(start_date, 'YYYY-MM-DD'), '-')
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM charges duplicate
+        USING charges keep
+        WHERE duplicate.idempotency_key = keep.idempotency_key
+          AND duplicate.id <> keep.id
+          AND duplicate.invoice_id IS NULL
+          AND (keep.invoice_id IS NOT NULL OR keep.id < duplicate.id)
+        """
+    )
+    op.execute("ALTER TABLE charges DROP CONSTRAINT IF EXISTS uq_charges_load_type_start")
+
+
+def _backfill_generic() -> None:
+    """Row-by-row backfill for dialects without to_char or DELETE ... USING."""
+    charges = sa.table(
+        "charges",
+        sa.column("id", sa.Integer),
+        sa.column("load_id", sa.Integer),
+        sa.column("invoice_id", sa.Integer),
+        sa.column("charge_type", sa.String),
+        sa.column("start_date", sa.Date),
+        sa.column("idempotency_key", sa.String),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(charges).order_by(charges.c.invoice_id.is_(None), charges.c.id)
+    ).all()
+    seen = set()
+    for row in rows:
+        start = row.start_date.isoformat() if row.start_date else "-"
+        key = f"{row.load_id}:{row.charge_type.lower()}:{start}"
+        if key in seen and row.invoice_id is None:
+            bind.execute(sa.delete(charges).where(charges.c.id == row.id))
+            continue
+        seen.add(key)
+        bind.execute(sa.update(charges).where(charges.c.id == row.id).values(idempotency_key=key))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("charges") as batch_op:
+        batch_op.drop_constraint("uq_charges_idempotency_key", type_="unique")
+        batch_op.drop_column("idempotency_key")
@@ -0,0 +1,60 @@
+"""Add indexes for charge lookups and open-invoice queries
+
+Charges are looked up by load and by invoice, and the aging and collections
+queries filter invoices by customer, status and due date. The indexes are
+built CONCURRENTLY, outside the migration transaction, so the tables stay
+writable while they build.
+
+Revision ID: 8d3e6a0f4c21
+Revises: 5b2f8c1d9e47
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3e6a0f4c21'
+down_revision: Union[str, None] = '5b2f8c1d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not (inspector.has_table("charges") and inspector.has_table("invoices")):
+        return  # init_db creates the tables with their indexes
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_charges_load_id", "charges", ["load_id"],
+            postgresql_include=["charge_type", "amount"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_charges_invoice_id", "charges", ["invoice_id"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_invoices_customer_status_due_date", "invoices", ["customer_id", "status", "due_date"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_invoices_open_due_date", "invoices", ["due_date"],
+            postgresql_where=sa.text("status NOT IN ('PAID', 'VOIDED', 'CANCELLED')"),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table in (
+            ("ix_invoices_open_due_date", "invoices"),
+            ("ix_invoices_customer_status_due_date", "invoices"),
+            ("ix_charges_invoice_id", "charges"),
+            ("ix_charges_load_id", "charges"),
+        ):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
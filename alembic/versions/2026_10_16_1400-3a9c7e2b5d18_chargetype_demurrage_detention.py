@@ -0,0 +1,36 @@
+"""Add DEMURRAGE and DETENTION to the chargetype enum
+
+Databases created before these charge types existed have a chargetype enum
+without them, and inserting such charges fails. ALTER TYPE ... ADD VALUE
+cannot run inside a transaction block on older Postgres versions, so it runs
+in an autocommit block.
+
+Revision ID: 3a9c7e2b5d18
+Revises: 8d3e6a0f4c21
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a9c7e2b5d18'
+down_revision: Union[str, None] = '8d3e6a0f4c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return  # other dialects store the enum as VARCHAR
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE chargetype ADD VALUE IF NOT EXISTS 'DEMURRAGE'")
+        op.execute("ALTER TYPE chargetype ADD VALUE IF NOT EXISTS 'DETENTION'")
+
+
+def downgrade() -> None:
+    pass  # Postgres cannot drop enum values
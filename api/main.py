@@ -4,11 +4,12 @@ from typing import AsyncGenerator
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from config import get_settings
 from logging_config import setup_logging, get_logger
 from models import init_db
+from integrations.terminal49_client import close_http_client
 from api.routes import loads, containers, invoices, customers, agent, health
 from api.webhooks import terminal49, quickbooks
 
@@ -31,6 +32,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     yield
     
     logger.info("Shutting down AI Billing Agent API")
+    await close_http_client()
 
 
 app = FastAPI(
@@ -38,6 +40,7 @@ app = FastAPI(
     description="AI-powered billing automation for intermodal trucking",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -52,7 +55,7 @@ app.add_middleware(
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
     )
@@ -62,7 +65,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions."""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"},
     )
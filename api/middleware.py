@@ -4,7 +4,7 @@ import uuid
 from typing import Callable
 
 from fastapi import Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
@@ -68,7 +68,7 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                 error=str(e),
                 error_type=type(e).__name__,
             )
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={
                     "error": type(e).__name__,
@@ -81,7 +81,7 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                 "Validation error",
                 error=str(e),
             )
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={
                     "error": "ValidationError",
@@ -96,7 +96,7 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                 error_type=type(e).__name__,
                 exc_info=True,
             )
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "error": "InternalServerError",
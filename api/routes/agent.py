@@ -1,15 +1,20 @@
 """AI Agent endpoints."""
+import re
+from datetime import date
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from models import get_db
 from repositories.container_repository import ContainerRepository
-from repositories.invoice_repository import InvoiceRepository
 from agents import TrackingAgent, DisputeAgent
 
 router = APIRouter()
 
+CONTAINER_RE = re.compile(r"\b[A-Z0-9]{11}\b", re.IGNORECASE)
+
 
 class QueryRequest(BaseModel):
     query: str
@@ -24,17 +29,25 @@ class DisputeRequest(BaseModel):
     reason: str | None = None
 
 
+class CollectionsRequest(BaseModel):
+    invoice_id: int
+
+
+class DisputeSummaryRequest(BaseModel):
+    invoice_id: int
+    messages: list[str]
+
+
 def _find_container_in_query(query_text: str, db: Session):
     """Extract container number from query (11 alphanumeric chars) and fetch from DB."""
-    repo = ContainerRepository(db)
-    for word in query_text.split():
-        if len(word) == 11 and word.isalnum():
-            return repo.get_by_container_number(word.upper())
-    return None
+    match = CONTAINER_RE.search(query_text)
+    if not match:
+        return None
+    return ContainerRepository(db).get_by_container_number(match.group(0))
 
 
 @router.post("/query")
-async def agent_query(request: QueryRequest, db: Session = Depends(get_db)):
+def agent_query(request: QueryRequest, db: Session = Depends(get_db)):
     """Natural language query to AI agent."""
     query = request.query.lower()
     if "status" in query and "container" in query:
@@ -59,7 +72,48 @@ async def analyze_container(request: AnalyzeRequest, db: Session = Depends(get_d
 @router.post("/draft-dispute-response")
 async def draft_dispute_response(request: DisputeRequest, db: Session = Depends(get_db)):
     """Draft response to invoice dispute."""
-    invoice = InvoiceRepository(db).get_by_id(request.invoice_id)
+    agent = DisputeAgent(db)
+    invoice = agent.load_invoice(request.invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return await agent.draft_dispute_response(invoice, request.reason)
+
+
+@router.post("/draft-dispute-response/stream")
+async def stream_dispute_response(request: DisputeRequest, db: Session = Depends(get_db)):
+    """Stream a response draft for an invoice dispute."""
+    agent = DisputeAgent(db)
+    invoice = agent.load_invoice(request.invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return StreamingResponse(
+        agent.stream_dispute_response(invoice, request.reason),
+        media_type="text/plain",
+    )
+
+
+@router.post("/dispute-summary/stream")
+async def stream_dispute_summary(request: DisputeSummaryRequest, db: Session = Depends(get_db)):
+    """Stream an executive summary of a dispute conversation."""
+    agent = DisputeAgent(db)
+    invoice = agent.load_invoice(request.invoice_id)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return StreamingResponse(
+        agent.stream_dispute_summary(invoice, request.messages),
+        media_type="text/plain",
+    )
+
+
+@router.post("/draft-collections-email/stream")
+async def stream_collections_email(request: CollectionsRequest, db: Session = Depends(get_db)):
+    """Stream a collections email draft for an overdue invoice."""
+    agent = DisputeAgent(db)
+    invoice = agent.load_invoice(request.invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    return await DisputeAgent(db).draft_dispute_response(invoice, request.reason)
+    days_overdue = max(0, (date.today() - invoice.due_date).days) if invoice.due_date else 0
+    return StreamingResponse(
+        agent.stream_collections_email(invoice, days_overdue),
+        media_type="text/plain",
+    )
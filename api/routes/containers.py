@@ -7,6 +7,7 @@ from pydantic import BaseModel, ConfigDict
 from sqlalchemy.orm import Session
 
 from models import get_db, Container
+from repositories.container_repository import ContainerRepository
 
 router = APIRouter()
 
@@ -22,7 +23,7 @@ class ContainerResponse(BaseModel):
 
 
 @router.get("/containers", response_model=List[ContainerResponse])
-async def list_containers(
+def list_containers(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
@@ -33,13 +34,9 @@ async def list_containers(
 
 
 @router.get("/containers/{container_number}", response_model=ContainerResponse)
-async def get_container(container_number: str, db: Session = Depends(get_db)):
+def get_container(container_number: str, db: Session = Depends(get_db)):
     """Get container by number."""
-    container = (
-        db.query(Container)
-        .filter(Container.container_number == container_number)
-        .first()
-    )
+    container = ContainerRepository(db).get_by_container_number(container_number)
     if not container:
         raise HTTPException(status_code=404, detail="Container not found")
     return container
@@ -19,7 +19,7 @@ class CustomerResponse(BaseModel):
 
 
 @router.get("/customers", response_model=List[CustomerResponse])
-async def list_customers(
+def list_customers(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
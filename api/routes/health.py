@@ -9,7 +9,7 @@ router = APIRouter()
 
 
 @router.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+def health_check(db: Session = Depends(get_db)):
     """Health check endpoint (database and core dependencies)."""
     service = HealthCheckService(db=db)
     result = service.check_all()
@@ -21,7 +21,7 @@ class InvoiceResponse(BaseModel):
 
 
 @router.get("/invoices", response_model=List[InvoiceResponse])
-async def list_invoices(
+def list_invoices(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
@@ -32,7 +32,7 @@ async def list_invoices(
 
 
 @router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
-async def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
+def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
     """Get invoice by ID."""
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if not invoice:
@@ -41,7 +41,7 @@ async def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/invoices/{invoice_id}/send")
-async def send_invoice(invoice_id: int, db: Session = Depends(get_db)):
+def send_invoice(invoice_id: int, db: Session = Depends(get_db)):
     """Send invoice to customer."""
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if not invoice:
@@ -20,7 +20,7 @@ class LoadResponse(BaseModel):
 
 
 @router.get("/loads", response_model=List[LoadResponse])
-async def list_loads(
+def list_loads(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
@@ -31,7 +31,7 @@ async def list_loads(
 
 
 @router.get("/loads/{load_id}", response_model=LoadResponse)
-async def get_load(load_id: int, db: Session = Depends(get_db)):
+def get_load(load_id: int, db: Session = Depends(get_db)):
     """Get load by ID."""
     load = db.query(Load).filter(Load.id == load_id).first()
     if not load:
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Request, HTTPException, Depends, Header
 from sqlalchemy.orm import Session
 
 from models import get_db, Container, ContainerEvent
-from integrations.terminal49_client import Terminal49Client
+from integrations.terminal49_client import Terminal49Client, get_client
 from config import get_settings
 
 router = APIRouter()
@@ -21,7 +21,7 @@ async def handle_terminal49_webhook(
     """Handle Terminal49 container update webhooks."""
     try:
         body = await request.body()
-        terminal49 = Terminal49Client()
+        terminal49 = get_client()
         if not terminal49.verify_webhook_signature(body, x_terminal49_signature or ""):
             logger.warning("Invalid webhook signature")
             raise HTTPException(status_code=401, detail="Invalid signature")
@@ -51,6 +51,7 @@ async def handle_terminal49_webhook(
         )
         db.add(event)
 
+        Terminal49Client.invalidate_status(tracking_id)
         attributes = data.get("attributes", {})
         container.current_status = attributes.get("status")
         container.location = attributes.get("location")
@@ -21,12 +21,17 @@ class Settings(BaseSettings):
     api_key: str
     webhook_base_url: str
     database_url: str
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 3600
+    db_pool_timeout: int = 30
     redis_url: str
     mcleod_api_url: str
     mcleod_api_token: str
     mcleod_company_id: str
     terminal49_api_key: str
     terminal49_webhook_secret: str
+    terminal49_max_parallel: int = 10
     quickbooks_client_id: str
     quickbooks_client_secret: str
     quickbooks_realm_id: str
@@ -36,6 +41,11 @@ class Settings(BaseSettings):
     llm_model: str = "claude-3-5-sonnet-20241022"
     llm_temperature_default: float = 0.3
     llm_temperature_creative: float = 0.5
+    llm_max_tokens: int = 1024
+    llm_batch_poll_interval: int = 30
+    llm_max_concurrency: int = 8
+    llm_cache_ttl: int = 3600
+    llm_cache_backend: str = "memory"
     sendgrid_api_key: Optional[str] = None
     twilio_account_sid: Optional[str] = None
     twilio_auth_token: Optional[str] = None
@@ -45,6 +55,7 @@ class Settings(BaseSettings):
     default_demurrage_rate: float = 150.0
     default_detention_rate: float = 125.0
     default_free_days: int = 3
+    billing_max_concurrency: int = 20
     mcleod_sync_interval: int = 15
     alert_check_interval: int = 60
     
@@ -1,7 +1,7 @@
 """QuickBooks Online API client."""
 import logging
 from datetime import date, datetime
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
 import httpx
 from pydantic import BaseModel
@@ -42,6 +42,7 @@ class QBLineItem(BaseModel):
 class QuickBooksClient:
     SANDBOX_BASE_URL = "https://sandbox-quickbooks.api.intuit.com/v3"
     PRODUCTION_BASE_URL = "https://quickbooks.api.intuit.com/v3"
+    MAX_BATCH_ITEMS = 30
     
     def __init__(self):
         self.client_id = settings.quickbooks_client_id
@@ -162,39 +163,9 @@ class QuickBooksClient:
     ) -> Optional[QBInvoice]:
         """Create an invoice in QuickBooks; returns QBInvoice or None."""
         try:
-            if invoice_date is None:
-                invoice_date = date.today()
-            
-            lines = []
-            for idx, item in enumerate(line_items, 1):
-                line = {
-                    "DetailType": "SalesItemLineDetail",
-                    "Amount": item.amount,
-                    "Description": item.description,
-                    "SalesItemLineDetail": {
-                        "Qty": item.quantity,
-                        "UnitPrice": item.unit_price or (item.amount / item.quantity),
-                    }
-                }
-                if item.item_ref:
-                    line["SalesItemLineDetail"]["ItemRef"] = {"value": item.item_ref}
-                
-                lines.append(line)
-            
-            payload = {
-                "CustomerRef": {"value": customer_id},
-                "TxnDate": invoice_date.isoformat(),
-                "Line": lines,
-            }
-            
-            if due_date:
-                payload["DueDate"] = due_date.isoformat()
-            
-            if doc_number:
-                payload["DocNumber"] = doc_number
-            
-            if memo:
-                payload["CustomerMemo"] = {"value": memo}
+            payload = self.build_invoice_payload(
+                customer_id, line_items, invoice_date, due_date, doc_number, memo
+            )
             
             async with httpx.AsyncClient(timeout=self.timeout) as client:
                 response = await client.post(
@@ -205,20 +176,7 @@ class QuickBooksClient:
                 response.raise_for_status()
                 
                 data = response.json()
-                invoice_data = data.get("Invoice", {})
-                
-                invoice = QBInvoice(
-                    id=invoice_data["Id"],
-                    doc_number=invoice_data["DocNumber"],
-                    customer_id=invoice_data["CustomerRef"]["value"],
-                    total_amount=float(invoice_data["TotalAmt"]),
-                    balance=float(invoice_data["Balance"]),
-                    due_date=datetime.strptime(
-                        invoice_data["DueDate"], "%Y-%m-%d"
-                    ).date() if invoice_data.get("DueDate") else None,
-                    status="Open" if float(invoice_data["Balance"]) > 0 else "Paid",
-                    sync_token=invoice_data["SyncToken"],
-                )
+                invoice = self._parse_invoice(data.get("Invoice", {}))
                 
                 logger.info(f"Created invoice {invoice.doc_number} for customer {customer_id}")
                 return invoice
@@ -230,6 +188,48 @@ class QuickBooksClient:
             logger.error(f"Error creating invoice: {e}")
             raise
     
+    async def create_invoices_batch(
+        self,
+        payloads: Dict[str, Dict[str, Any]],
+    ) -> Dict[str, Optional[QBInvoice]]:
+        """Create invoices via the /batch endpoint, up to MAX_BATCH_ITEMS per request.
+
+        payloads maps a caller batch ID to an invoice payload from
+        build_invoice_payload(); the result maps each ID to the created invoice, or
+        None if QuickBooks returned a fault for it or its batch request failed.
+        A failed request does not discard the results of the others.
+        """
+        results: Dict[str, Optional[QBInvoice]] = dict.fromkeys(payloads)
+        items = list(payloads.items())
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            for start in range(0, len(items), self.MAX_BATCH_ITEMS):
+                chunk = items[start:start + self.MAX_BATCH_ITEMS]
+                try:
+                    response = await client.post(
+                        f"{self.base_url}/batch",
+                        headers=self.headers,
+                        json={
+                            "BatchItemRequest": [
+                                {"bId": batch_id, "operation": "create", "Invoice": payload}
+                                for batch_id, payload in chunk
+                            ]
+                        },
+                    )
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.error(f"HTTP error creating batch of {len(chunk)} invoices: {e}")
+                    continue
+                
+                for item in response.json().get("BatchItemResponse", []):
+                    batch_id = item.get("bId")
+                    if "Invoice" in item:
+                        results[batch_id] = self._parse_invoice(item["Invoice"])
+                    else:
+                        logger.error(f"QuickBooks batch fault for {batch_id}: {item.get('Fault')}")
+        
+        logger.info(f"Created {sum(1 for r in results.values() if r)} invoices via batch")
+        return results
+    
     async def get_invoice(self, invoice_id: str) -> Optional[QBInvoice]:
         """Fetch a QuickBooks invoice by ID; returns None if not found."""
         try:
@@ -241,20 +241,7 @@ class QuickBooksClient:
                 response.raise_for_status()
                 
                 data = response.json()
-                invoice_data = data.get("Invoice", {})
-                
-                return QBInvoice(
-                    id=invoice_data["Id"],
-                    doc_number=invoice_data["DocNumber"],
-                    customer_id=invoice_data["CustomerRef"]["value"],
-                    total_amount=float(invoice_data["TotalAmt"]),
-                    balance=float(invoice_data["Balance"]),
-                    due_date=datetime.strptime(
-                        invoice_data["DueDate"], "%Y-%m-%d"
-                    ).date() if invoice_data.get("DueDate") else None,
-                    status="Open" if float(invoice_data["Balance"]) > 0 else "Paid",
-                    sync_token=invoice_data["SyncToken"],
-                )
+                return self._parse_invoice(data.get("Invoice", {}))
                 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
@@ -346,6 +333,67 @@ class QuickBooksClient:
             logger.error(f"Error querying invoices: {e}")
             raise
     
+    def build_invoice_payload(
+        self,
+        customer_id: str,
+        line_items: List[QBLineItem],
+        invoice_date: Optional[date] = None,
+        due_date: Optional[date] = None,
+        doc_number: Optional[str] = None,
+        memo: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build the QuickBooks invoice request body."""
+        if invoice_date is None:
+            invoice_date = date.today()
+        
+        lines = []
+        for item in line_items:
+            line = {
+                "DetailType": "SalesItemLineDetail",
+                "Amount": item.amount,
+                "Description": item.description,
+                "SalesItemLineDetail": {
+                    "Qty": item.quantity,
+                    "UnitPrice": item.unit_price or (item.amount / item.quantity),
+                }
+            }
+            if item.item_ref:
+                line["SalesItemLineDetail"]["ItemRef"] = {"value": item.item_ref}
+            
+            lines.append(line)
+        
+        payload = {
+            "CustomerRef": {"value": customer_id},
+            "TxnDate": invoice_date.isoformat(),
+            "Line": lines,
+        }
+        
+        if due_date:
+            payload["DueDate"] = due_date.isoformat()
+        
+        if doc_number:
+            payload["DocNumber"] = doc_number
+        
+        if memo:
+            payload["CustomerMemo"] = {"value": memo}
+        
+        return payload
+    
+    def _parse_invoice(self, invoice_data: Dict[str, Any]) -> QBInvoice:
+        """Convert a QuickBooks invoice object to QBInvoice."""
+        return QBInvoice(
+            id=invoice_data["Id"],
+            doc_number=invoice_data["DocNumber"],
+            customer_id=invoice_data["CustomerRef"]["value"],
+            total_amount=float(invoice_data["TotalAmt"]),
+            balance=float(invoice_data["Balance"]),
+            due_date=datetime.strptime(
+                invoice_data["DueDate"], "%Y-%m-%d"
+            ).date() if invoice_data.get("DueDate") else None,
+            status="Open" if float(invoice_data["Balance"]) > 0 else "Paid",
+            sync_token=invoice_data["SyncToken"],
+        )
+    
     async def test_connection(self) -> bool:
         """Return True if the QuickBooks API responds successfully."""
         try:
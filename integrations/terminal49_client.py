@@ -1,10 +1,13 @@
 """Terminal49 Container Tracking API client."""
 
+import asyncio
 import hashlib
 import hmac
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 from pydantic import BaseModel
@@ -15,6 +18,39 @@ from config import get_settings
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+HTTP_TIMEOUT = 30.0
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+
+@lru_cache(maxsize=None)
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP/2 client so polls reuse pooled connections."""
+    return httpx.AsyncClient(
+        base_url=Terminal49Client.API_BASE_URL,
+        timeout=HTTP_TIMEOUT,
+        limits=HTTP_LIMITS,
+        http2=True,
+    )
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client, if one was opened.
+
+    Call on application shutdown, or before leaving an event loop that will
+    not be reused (e.g. asyncio.run in a Celery task), since the pooled
+    connections and request slots are bound to the running loop.
+    """
+    if _get_http_client.cache_info().currsize:
+        await _get_http_client().aclose()
+        _get_http_client.cache_clear()
+    _get_request_slots.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _get_request_slots() -> asyncio.Semaphore:
+    """Bound in-flight Terminal49 requests to settings.terminal49_max_parallel."""
+    return asyncio.Semaphore(settings.terminal49_max_parallel)
+
 
 class ContainerMilestone(BaseModel):
     event_type: str
@@ -51,17 +87,29 @@ class Terminal49Container(BaseModel):
 
 class Terminal49Client:
     API_BASE_URL = "https://api.terminal49.com/v2"
+    STATUS_CACHE_TTL = 60
+    STATUS_CACHE_MAX_ENTRIES = 4096
+
+    _status_cache: Dict[str, Tuple[float, Terminal49Container]] = {}
     
     def __init__(self):
         self.api_key = settings.terminal49_api_key
         self.webhook_secret = settings.terminal49_webhook_secret
-        self.timeout = 30.0
         
         self.headers = {
             "Authorization": f"Token {self.api_key}",
             "Content-Type": "application/json",
         }
     
+    async def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a request on the shared client and raise for HTTP error statuses."""
+        async with _get_request_slots():
+            response = await _get_http_client().request(
+                method, path, headers=self.headers, **kwargs
+            )
+        response.raise_for_status()
+        return response
+    
     async def track_container(
         self,
         container_number: str,
@@ -80,20 +128,12 @@ class Terminal49Client:
             if ref_numbers:
                 payload["ref_numbers"] = ref_numbers
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.API_BASE_URL}/trackings",
-                    headers=self.headers,
-                    json=payload,
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                container = self._parse_container(data)
-                
-                logger.info(f"Started tracking container {container_number}")
-                return container
-                
+            response = await self._request("POST", "/trackings", json=payload)
+            container = self._parse_container(response.json())
+            
+            logger.info(f"Started tracking container {container_number}")
+            return container
+            
         except httpx.HTTPError as e:
             logger.error(f"HTTP error tracking container {container_number}: {e}")
             raise
@@ -103,20 +143,26 @@ class Terminal49Client:
     
     async def get_container_status(
         self,
-        tracking_id: str
+        tracking_id: str,
+        use_cache: bool = True,
     ) -> Optional[Terminal49Container]:
-        """Get current status of a tracked container by tracking ID."""
+        """Get current status of a tracked container by tracking ID.
+
+        Responses are reused for STATUS_CACHE_TTL seconds so back-to-back polls
+        of the same tracking skip the HTTP call.
+        """
+        if use_cache:
+            cached = self._status_cache.get(tracking_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.API_BASE_URL}/trackings/{tracking_id}",
-                    headers=self.headers,
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                return self._parse_container(data)
-                
+            response = await self._request("GET", f"/trackings/{tracking_id}")
+            container = self._parse_container(response.json())
+            if len(self._status_cache) >= self.STATUS_CACHE_MAX_ENTRIES:
+                self._status_cache.pop(next(iter(self._status_cache)))
+            self._status_cache[tracking_id] = (time.monotonic() + self.STATUS_CACHE_TTL, container)
+            return container
+            
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 logger.warning(f"Tracking not found: {tracking_id}")
@@ -127,6 +173,30 @@ class Terminal49Client:
             logger.error(f"Error fetching tracking {tracking_id}: {e}")
             raise
     
+    async def get_container_statuses(
+        self,
+        tracking_ids: List[str],
+    ) -> Dict[str, Optional[Terminal49Container]]:
+        """Get current status for many tracking IDs, keyed by tracking ID.
+
+        Terminal49 has no multi-ID lookup, so the GETs are issued concurrently
+        over the shared connection pool (bounded by terminal49_max_parallel).
+        Lookups that fail or are not found map to None.
+        """
+        results = await asyncio.gather(
+            *(self.get_container_status(tracking_id) for tracking_id in tracking_ids),
+            return_exceptions=True,
+        )
+        return {
+            tracking_id: None if isinstance(result, BaseException) else result
+            for tracking_id, result in zip(tracking_ids, results)
+        }
+    
+    @classmethod
+    def invalidate_status(cls, tracking_id: str) -> None:
+        """Drop a cached status so the next poll fetches it fresh."""
+        cls._status_cache.pop(tracking_id, None)
+    
     async def list_trackings(
         self,
         page: int = 1,
@@ -139,28 +209,21 @@ class Terminal49Client:
                 "per_page": per_page,
             }
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.API_BASE_URL}/trackings",
-                    headers=self.headers,
-                    params=params,
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                containers = []
-                
-                for item in data.get("data", []):
-                    try:
-                        container = self._parse_container(item)
-                        containers.append(container)
-                    except Exception as e:
-                        logger.error(f"Error parsing container: {e}")
-                        continue
-                
-                logger.info(f"Retrieved {len(containers)} tracked containers")
-                return containers
-                
+            response = await self._request("GET", "/trackings", params=params)
+            data = response.json()
+            containers = []
+            
+            for item in data.get("data", []):
+                try:
+                    container = self._parse_container(item)
+                    containers.append(container)
+                except Exception as e:
+                    logger.error(f"Error parsing container: {e}")
+                    continue
+            
+            logger.info(f"Retrieved {len(containers)} tracked containers")
+            return containers
+            
         except Exception as e:
             logger.error(f"Error listing trackings: {e}")
             raise
@@ -189,18 +252,11 @@ class Terminal49Client:
                 "active": True,
             }
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.API_BASE_URL}/webhooks",
-                    headers=self.headers,
-                    json=payload,
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                logger.info(f"Created webhook: {data.get('id')}")
-                return data
-                
+            response = await self._request("POST", "/webhooks", json=payload)
+            data = response.json()
+            logger.info(f"Created webhook: {data.get('id')}")
+            return data
+            
         except Exception as e:
             logger.error(f"Error creating webhook: {e}")
             raise
@@ -298,15 +354,15 @@ class Terminal49Client:
     async def test_connection(self) -> bool:
         """Return True if the Terminal49 API responds successfully."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.API_BASE_URL}/trackings?per_page=1",
-                    headers=self.headers,
-                )
-                response.raise_for_status()
-                logger.info("Terminal49 API connection successful")
-                return True
+            await self._request("GET", "/trackings", params={"per_page": 1})
+            logger.info("Terminal49 API connection successful")
+            return True
         except Exception as e:
             logger.error(f"Terminal49 API connection failed: {e}")
             return False
 
+
+@lru_cache(maxsize=None)
+def get_client() -> Terminal49Client:
+    """Return the process-wide Terminal49Client."""
+    return Terminal49Client()
@@ -1,6 +1,9 @@
 """Logging configuration with structured logging support."""
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any
 
 import structlog
@@ -8,12 +11,22 @@ from config import get_settings
 
 
 def setup_logging() -> None:
-    """Configure structlog: JSON in production, colored console in development."""
+    """Configure structlog: JSON in production, colored console in development.
+
+    Records are handed to a QueueHandler and written to stdout by a background
+    QueueListener, so request handlers and worker threads never block on I/O.
+    """
     settings = get_settings()
     
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
     logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
+        handlers=[QueueHandler(log_queue)],
         level=getattr(logging, settings.log_level.upper()),
     )
     
@@ -4,7 +4,7 @@ from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 
 from models import (
     Invoice,
@@ -78,64 +78,58 @@ class MetricsCollector:
     def get_billing_metrics(self, start_date: date, end_date: date) -> BillingMetrics:
         """Return billing metrics for the given date range."""
         logger.info(f"Calculating billing metrics for {start_date} to {end_date}")
-        invoices = self.db.query(Invoice).filter(
+        invoice_totals = self.db.query(
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0.0),
+            func.coalesce(func.sum(case((Invoice.status == InvoiceStatus.PAID, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Invoice.status.in_([
+                InvoiceStatus.SENT,
+                InvoiceStatus.PENDING_APPROVAL,
+                InvoiceStatus.OVERDUE,
+            ]), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Invoice.status == InvoiceStatus.DISPUTED, 1), else_=0)), 0),
+        ).filter(
             and_(
                 Invoice.invoice_date >= start_date,
                 Invoice.invoice_date <= end_date
             )
-        ).all()
-        
-        total_revenue = sum(inv.total_amount for inv in invoices)
-        total_invoices = len(invoices)
-        
-        paid_invoices = sum(
-            1 for inv in invoices if inv.status == InvoiceStatus.PAID
-        )
-        
-        outstanding_invoices = sum(
-            1 for inv in invoices
-            if inv.status in [
-                InvoiceStatus.SENT,
-                InvoiceStatus.PENDING_APPROVAL,
-                InvoiceStatus.OVERDUE,
-            ]
-        )
-        
-        disputed_invoices = sum(
-            1 for inv in invoices if inv.status == InvoiceStatus.DISPUTED
-        )
+        ).one()
+        (
+            total_invoices,
+            total_revenue,
+            paid_invoices,
+            outstanding_invoices,
+            disputed_invoices,
+        ) = invoice_totals
         
         average_invoice_amount = (
             total_revenue / total_invoices if total_invoices > 0 else 0.0
         )
         
-        charges = self.db.query(Charge).join(Invoice).filter(
+        def _amount_for(charge_type: ChargeType):
+            return func.coalesce(
+                func.sum(case((Charge.charge_type == charge_type, Charge.amount), else_=0.0)),
+                0.0,
+            )
+        
+        total_charges, total_per_diem, total_demurrage, total_detention = self.db.query(
+            func.count(Charge.id),
+            _amount_for(ChargeType.PER_DIEM),
+            _amount_for(ChargeType.DEMURRAGE),
+            _amount_for(ChargeType.DETENTION),
+        ).join(Invoice).filter(
             and_(
                 Invoice.invoice_date >= start_date,
                 Invoice.invoice_date <= end_date
             )
-        ).all()
-        
-        total_charges = len(charges)
-        
-        total_per_diem = sum(
-            c.amount for c in charges if c.charge_type == ChargeType.PER_DIEM
-        )
-        
-        total_demurrage = sum(
-            c.amount for c in charges if c.charge_type == ChargeType.DEMURRAGE
-        )
-        
-        total_detention = sum(
-            c.amount for c in charges if c.charge_type == ChargeType.DETENTION
-        )
+        ).one()
         
         return BillingMetrics(
             total_revenue=float(total_revenue),
             total_invoices=total_invoices,
-            paid_invoices=paid_invoices,
-            outstanding_invoices=outstanding_invoices,
-            disputed_invoices=disputed_invoices,
+            paid_invoices=int(paid_invoices),
+            outstanding_invoices=int(outstanding_invoices),
+            disputed_invoices=int(disputed_invoices),
             average_invoice_amount=float(average_invoice_amount),
             total_charges=total_charges,
             total_per_diem_charges=float(total_per_diem),
@@ -233,17 +227,22 @@ class MetricsCollector:
             f"from {start_date} to {end_date}"
         )
         
-        loads = self.db.query(Load).filter(
+        total_loads = self.db.query(func.count(Load.id)).filter(
             and_(
                 Load.customer_id == customer_id,
                 Load.created_at >= datetime.combine(start_date, datetime.min.time()),
                 Load.created_at <= datetime.combine(end_date, datetime.max.time())
             )
-        ).all()
-        
-        total_loads = len(loads)
-        
-        invoices = self.db.query(Invoice).filter(
+        ).scalar()
+        
+        invoices = self.db.query(
+            Invoice.total_amount,
+            Invoice.amount_paid,
+            Invoice.status,
+            Invoice.invoice_date,
+            Invoice.paid_date,
+            Invoice.due_date,
+        ).filter(
             and_(
                 Invoice.customer_id == customer_id,
                 Invoice.invoice_date >= start_date,
@@ -251,49 +250,38 @@ class MetricsCollector:
             )
         ).all()
         
-        total_invoiced = sum(inv.total_amount for inv in invoices)
-        
-        total_paid = sum(
-            inv.amount_paid for inv in invoices
-            if inv.amount_paid
-        )
-        
-        outstanding_balance = sum(
-            inv.total_amount - (inv.amount_paid or 0)
-            for inv in invoices
-            if inv.status != InvoiceStatus.PAID
-        )
-        
-        payment_days = []
-        for inv in invoices:
-            if inv.status == InvoiceStatus.PAID and inv.paid_date and inv.invoice_date:
-                days = (inv.paid_date - inv.invoice_date).days
-                payment_days.append(days)
+        total_invoiced = 0.0
+        total_paid = 0.0
+        outstanding_balance = 0.0
+        payment_days_total = 0
+        payment_days_count = 0
+        disputed = 0
+        paid_count = 0
+        on_time_payments = 0
+        for total_amount, amount_paid, status, invoice_date, paid_date, due_date in invoices:
+            total_invoiced += total_amount
+            if amount_paid:
+                total_paid += amount_paid
+            if status == InvoiceStatus.PAID:
+                paid_count += 1
+                if paid_date and invoice_date:
+                    payment_days_total += (paid_date - invoice_date).days
+                    payment_days_count += 1
+                if paid_date and due_date and paid_date <= due_date:
+                    on_time_payments += 1
+            else:
+                outstanding_balance += total_amount - (amount_paid or 0)
+                if status == InvoiceStatus.DISPUTED:
+                    disputed += 1
         
         average_payment = (
-            sum(payment_days) / len(payment_days) if payment_days else 0.0
-        )
-        
-        disputed = sum(
-            1 for inv in invoices if inv.status == InvoiceStatus.DISPUTED
+            payment_days_total / payment_days_count if payment_days_count else 0.0
         )
         
         dispute_rate = (
             (disputed / len(invoices) * 100) if invoices else 0.0
         )
         
-        on_time_payments = sum(
-            1 for inv in invoices
-            if inv.status == InvoiceStatus.PAID
-            and inv.paid_date
-            and inv.due_date
-            and inv.paid_date <= inv.due_date
-        )
-        
-        paid_count = sum(
-            1 for inv in invoices if inv.status == InvoiceStatus.PAID
-        )
-        
         on_time_rate = (
             (on_time_payments / paid_count * 100) if paid_count > 0 else 0.0
         )
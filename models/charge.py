@@ -1,7 +1,8 @@
 """Billing charge models."""
 from datetime import datetime, date
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Enum as SQLEnum, Boolean
+from typing import Any, Optional
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Enum as SQLEnum, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from models.database import Base
@@ -11,13 +12,35 @@ class ChargeType(str, Enum):
     """Types of charges that can be billed."""
     BASE_FREIGHT = "base_freight"
     PER_DIEM = "per_diem"
+    DEMURRAGE = "demurrage"
+    DETENTION = "detention"
 
 
 
+def charge_idempotency_key(load_id: int, charge_type: Any, start_date: Optional[date]) -> str:
+    """Key identifying a charge for retry-safe inserts.
+
+    A missing start date (base freight, or per diem and demurrage before their
+    start is known) maps to "-" so retries still collide on the key.
+    """
+    charge_type = getattr(charge_type, "value", charge_type)
+    return f"{load_id}:{charge_type}:{start_date.isoformat() if start_date else '-'}"
+
+
+def _default_idempotency_key(context) -> str:
+    params = context.get_current_parameters()
+    return charge_idempotency_key(params["load_id"], params["charge_type"], params.get("start_date"))
+
+
 class Charge(Base):
     """Individual charge line item for billing."""
     
     __tablename__ = "charges"
+    __table_args__ = (
+        Index("ix_charges_load_id", "load_id", postgresql_include=["charge_type", "amount"]),
+        Index("ix_charges_invoice_id", "invoice_id"),
+        UniqueConstraint("idempotency_key", name="uq_charges_idempotency_key"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     load_id = Column(Integer, ForeignKey("loads.id"), nullable=False)
@@ -30,6 +53,7 @@ class Charge(Base):
     amount = Column(Float, nullable=False)
     start_date = Column(Date)
     end_date = Column(Date)
+    idempotency_key = Column(String(100), nullable=False, default=_default_idempotency_key)
     is_billable = Column(Boolean, default=True)
     is_approved = Column(Boolean, default=False)
     is_disputed = Column(Boolean, default=False)
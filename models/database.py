@@ -1,20 +1,31 @@
 """Database configuration and session management."""
 from contextlib import contextmanager
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Any, Generator
 
 from config import get_settings
 
 settings = get_settings()
 
+
+def _json_dumps(value: Any) -> str:
+    """Serialize JSON columns with orjson; Decimals are stored as floats."""
+    return orjson.dumps(value, default=float).decode()
+
+
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
     echo=settings.is_development,
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
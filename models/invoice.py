@@ -1,7 +1,7 @@
 """Invoice models."""
 from datetime import datetime, date
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Enum as SQLEnum, Boolean, Index, text
 from sqlalchemy.orm import relationship
 
 from models.database import Base
@@ -25,6 +25,14 @@ class Invoice(Base):
     """Invoice in QuickBooks."""
     
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_customer_status_due_date", "customer_id", "status", "due_date"),
+        Index(
+            "ix_invoices_open_due_date",
+            "due_date",
+            postgresql_where=text("status NOT IN ('PAID', 'VOIDED', 'CANCELLED')"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String(50), unique=True, index=True)
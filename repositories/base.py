@@ -2,7 +2,7 @@
 from typing import Generic, TypeVar, Type, Optional, List, Dict, Any
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, insert, select
 
 from exceptions import DatabaseError
 from logging_config import get_logger
@@ -22,9 +22,7 @@ class BaseRepository(Generic[ModelType]):
     def get_by_id(self, id: int) -> Optional[ModelType]:
         """Get entity by ID."""
         try:
-            return self.db.query(self.model).filter(
-                self.model.id == id
-            ).first()
+            return self.db.get(self.model, id)
         except Exception as e:
             logger.error(f"Error getting {self.model.__name__} by ID {id}: {e}")
             raise DatabaseError(f"Failed to get {self.model.__name__}") from e
@@ -139,25 +137,22 @@ class BaseRepository(Generic[ModelType]):
             raise DatabaseError(f"Failed to check {self.model.__name__} existence") from e
     
     def bulk_create(self, entities: List[Dict[str, Any]]) -> List[ModelType]:
-        """Bulk create entities."""
+        """Bulk create entities with one batched INSERT ... RETURNING."""
+        if not entities:
+            return []
         try:
-            created = []
-            
-            for entity_data in entities:
-                entity = self.model(**entity_data)
-                self.db.add(entity)
-                created.append(entity)
-            
+            ids = self.db.scalars(
+                insert(self.model).returning(self.model.id), entities
+            ).all()
             self.db.commit()
-            
-            for entity in created:
-                self.db.refresh(entity)
+            created = self.db.scalars(
+                select(self.model).where(self.model.id.in_(ids)).order_by(self.model.id)
+            ).all()
             
             logger.info(f"Bulk created {len(created)} {self.model.__name__} entities")
-            return created
+            return list(created)
             
         except Exception as e:
             self.db.rollback()
             logger.error(f"Error bulk creating {self.model.__name__}: {e}")
             raise DatabaseError(f"Failed to bulk create {self.model.__name__}") from e
-
@@ -3,7 +3,7 @@ from typing import List, Optional
 from datetime import date
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 
 from models import Container
 from repositories.base import BaseRepository
@@ -19,9 +19,9 @@ class ContainerRepository(BaseRepository[Container]):
         super().__init__(Container, db)
 
     def get_by_container_number(self, container_number: str) -> Optional[Container]:
-        """Get container by container number."""
-        return self.db.query(Container).filter(
-            Container.container_number == container_number.upper()
+        """Get container by container number (unique index lookup)."""
+        return self.db.scalars(
+            select(Container).where(Container.container_number == container_number.upper())
         ).first()
 
     def get_active_containers(self) -> List[Container]:
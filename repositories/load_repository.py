@@ -2,7 +2,7 @@
 from typing import List, Optional
 from datetime import date
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from models import Load, Charge
 from repositories.base import BaseRepository
@@ -36,7 +36,10 @@ class LoadRepository(BaseRepository[Load]):
         billed_load_ids = self.db.query(Charge.load_id).filter(
             Charge.invoice_id.isnot(None)
         ).distinct()
-        return self.db.query(Load).filter(
+        return self.db.query(Load).options(
+            joinedload(Load.customer),
+            joinedload(Load.container),
+        ).filter(
             Load.actual_delivery_date.isnot(None),
             ~Load.id.in_(billed_load_ids)
         ).order_by(Load.actual_delivery_date.asc()).all()
@@ -1,7 +1,7 @@
 """Alert and notification service."""
 import logging
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from sqlalchemy.orm import Session
 from sendgrid import SendGridAPIClient
@@ -18,6 +18,9 @@ settings = get_settings()
 class AlertService:
     def __init__(self, db: Session):
         self.db = db
+        # Queued alerts keyed by (container_id, alert_type, charge_type) so
+        # dedupe lookups stay O(1) over a poll cycle.
+        self._pending: Dict[Tuple[int, AlertType, Optional[str]], Alert] = {}
         
         if settings.sendgrid_api_key:
             self.sendgrid_client = SendGridAPIClient(settings.sendgrid_api_key)
@@ -34,11 +37,16 @@ class AlertService:
             self.twilio_client = None
             logger.warning("Twilio credentials not configured")
     
-    def _save_alert(self, alert: Alert, log_message: str) -> Optional[Alert]:
-        """Persist an alert and log; rollback and return None on error."""
+    def _save_alert(self, alert: Alert, log_message: str, commit: bool = True) -> Optional[Alert]:
+        """Persist an alert and log; rollback and return None on error.
+
+        With commit=False the alert is only added to the session and is saved
+        by the caller's commit.
+        """
         try:
             self.db.add(alert)
-            self.db.commit()
+            if commit:
+                self.db.commit()
             logger.info(log_message)
             return alert
         except Exception as e:
@@ -46,11 +54,29 @@ class AlertService:
             self.db.rollback()
             return None
 
-    def create_per_diem_alert(
-        self, container: Container, customer: Customer, hours_until: int
-    ) -> Optional[Alert]:
-        """Create per diem warning alert."""
-        existing = (
+    def flush(self) -> int:
+        """Persist queued alerts in one transaction and return how many were saved."""
+        if not self._pending:
+            return 0
+        count = len(self._pending)
+        try:
+            self.db.bulk_save_objects(list(self._pending.values()))
+            self.db.commit()
+            logger.info(f"Saved {count} queued alerts")
+            return count
+        except Exception as e:
+            logger.error(f"Error saving queued alerts: {e}")
+            self.db.rollback()
+            return 0
+        finally:
+            self._pending.clear()
+
+    def _existing_per_diem_alert(self, container: Container) -> Optional[Alert]:
+        """Return an open per diem alert for container, queued or saved."""
+        queued = self._pending.get((container.id, AlertType.PER_DIEM_WARNING, None))
+        if queued is not None:
+            return queued
+        return (
             self.db.query(Alert)
             .filter(
                 Alert.container_id == container.id,
@@ -59,12 +85,10 @@ class AlertService:
             )
             .first()
         )
-        if existing:
-            logger.info(f"Per diem alert already exists for container {container.container_number}")
-            return existing
 
+    def _per_diem_alert(self, container: Container, customer: Customer, hours_until: int) -> Alert:
         priority = "urgent" if hours_until <= 6 else "high" if hours_until <= 24 else "medium"
-        alert = Alert(
+        return Alert(
             alert_type=AlertType.PER_DIEM_WARNING,
             priority=priority,
             customer_id=customer.id,
@@ -77,19 +101,43 @@ class AlertService:
             send_email=customer.send_alerts and bool(customer.alert_email or customer.email),
             send_sms=priority == "urgent" and bool(customer.alert_phone or customer.phone),
             scheduled_for=datetime.utcnow(),
-            metadata={
+            alert_metadata={
                 "container_number": container.container_number,
                 "hours_until": hours_until,
                 "per_diem_starts": container.per_diem_starts.isoformat() if container.per_diem_starts else None,
             },
         )
+
+    def create_per_diem_alert(
+        self, container: Container, customer: Customer, hours_until: int
+    ) -> Optional[Alert]:
+        """Create per diem warning alert."""
+        existing = self._existing_per_diem_alert(container)
+        if existing:
+            logger.info(f"Per diem alert already exists for container {container.container_number}")
+            return existing
+
+        alert = self._per_diem_alert(container, customer, hours_until)
         return self._save_alert(
             alert,
-            f"Created per diem alert for container {container.container_number}, priority: {priority}",
+            f"Created per diem alert for container {container.container_number}, priority: {alert.priority}",
         )
 
+    def queue_per_diem_alert(
+        self, container: Container, customer: Customer, hours_until: int
+    ) -> Alert:
+        """Queue a per diem warning alert for the next flush()."""
+        existing = self._existing_per_diem_alert(container)
+        if existing:
+            logger.info(f"Per diem alert already exists for container {container.container_number}")
+            return existing
+
+        alert = self._per_diem_alert(container, customer, hours_until)
+        self._pending[(container.id, AlertType.PER_DIEM_WARNING, None)] = alert
+        return alert
+
     def create_container_available_alert(
-        self, container: Container, customer: Customer
+        self, container: Container, customer: Customer, commit: bool = True
     ) -> Optional[Alert]:
         """Create alert when container is available for pickup."""
         alert = Alert(
@@ -104,19 +152,20 @@ class AlertService:
             message=self._format_available_message(container),
             send_email=True,
             scheduled_for=datetime.utcnow(),
-            metadata={
+            alert_metadata={
                 "container_number": container.container_number,
                 "location": container.location,
                 "last_free_day": container.last_free_day.isoformat() if container.last_free_day else None,
             },
         )
-        return self._save_alert(alert, f"Created availability alert for container {container.container_number}")
+        return self._save_alert(
+            alert, f"Created availability alert for container {container.container_number}", commit
+        )
 
-    def create_charge_accruing_alert(
+    def _charge_accruing_alert(
         self, container: Container, customer: Customer, charge_type: str, daily_rate: float
-    ) -> Optional[Alert]:
-        """Create alert when charges are actively accruing."""
-        alert = Alert(
+    ) -> Alert:
+        return Alert(
             alert_type=AlertType.CHARGE_ACCRUING,
             priority="urgent",
             customer_id=customer.id,
@@ -129,10 +178,25 @@ class AlertService:
             send_email=True,
             send_sms=True,
             scheduled_for=datetime.utcnow(),
-            metadata={"container_number": container.container_number, "charge_type": charge_type, "daily_rate": daily_rate},
+            alert_metadata={"container_number": container.container_number, "charge_type": charge_type, "daily_rate": daily_rate},
         )
+
+    def create_charge_accruing_alert(
+        self, container: Container, customer: Customer, charge_type: str, daily_rate: float
+    ) -> Optional[Alert]:
+        """Create alert when charges are actively accruing."""
+        alert = self._charge_accruing_alert(container, customer, charge_type, daily_rate)
         return self._save_alert(alert, f"Created charge accruing alert for container {container.container_number}")
 
+    def queue_charge_accruing_alert(
+        self, container: Container, customer: Customer, charge_type: str, daily_rate: float
+    ) -> Alert:
+        """Queue a charge accruing alert for the next flush(); one per container and charge type."""
+        key = (container.id, AlertType.CHARGE_ACCRUING, charge_type)
+        if key not in self._pending:
+            self._pending[key] = self._charge_accruing_alert(container, customer, charge_type, daily_rate)
+        return self._pending[key]
+
     def create_invoice_alert(self, invoice: Invoice, customer: Customer) -> Optional[Alert]:
         """Create alert when invoice is created."""
         alert = Alert(
@@ -145,7 +209,7 @@ class AlertService:
             message=self._format_invoice_message(invoice),
             send_email=True,
             scheduled_for=datetime.utcnow(),
-            metadata={
+            alert_metadata={
                 "invoice_number": invoice.invoice_number,
                 "total_amount": float(invoice.total_amount),
                 "due_date": invoice.due_date.isoformat() if invoice.due_date else None,
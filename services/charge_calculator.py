@@ -1,7 +1,7 @@
 """Charge calculation service."""
 import logging
 from datetime import date, datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -16,7 +16,12 @@ settings = get_settings()
 class ChargeCalculator:
     def __init__(self, db: Session):
         self.db = db
-        self._rate_cache = {}
+        self._rate_cache: Dict[Tuple[int, str], float] = {}
+    
+    def invalidate_customer(self, customer_id: int) -> None:
+        """Drop cached rates for a customer after their rate card changes."""
+        for key in [k for k in self._rate_cache if k[0] == customer_id]:
+            self._rate_cache.pop(key, None)
     
     def calculate_last_free_day(self, container: Container, customer: Customer) -> Optional[date]:
         """Calculate last free day before charges start."""
@@ -36,15 +41,17 @@ class ChargeCalculator:
     
     def _get_customer_rate(self, customer: Customer, rate_type: str, default_rate: float) -> float:
         """Get customer rate with caching and validation."""
-        cache_key = f"{customer.id}_{rate_type}"
-        if cache_key not in self._rate_cache:
+        cache_key = (customer.id, rate_type)
+        rate = self._rate_cache.get(cache_key)
+        if rate is None:
             rate = getattr(customer, rate_type, None) or default_rate
             try:
-                self._rate_cache[cache_key] = validate_positive_amount(rate, rate_type, allow_zero=False)
+                rate = validate_positive_amount(rate, rate_type, allow_zero=False)
             except Exception as e:
                 logger.warning(f"Invalid rate for {rate_type}, using default: {e}")
-                self._rate_cache[cache_key] = default_rate
-        return self._rate_cache[cache_key]
+                rate = default_rate
+            self._rate_cache[cache_key] = rate
+        return rate
     
     def _calculate_charge_days(
         self,
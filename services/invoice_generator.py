@@ -3,11 +3,13 @@ import logging
 from datetime import date, timedelta
 from typing import List, Optional
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from models import Invoice, InvoiceStatus, InvoiceLineItem, Charge, Load, Customer
 from integrations.quickbooks_client import QuickBooksClient, QBLineItem
 from config import get_settings
+from utils.async_helpers import run_sync
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -24,9 +26,16 @@ class InvoiceGenerator:
         self,
         load: Load,
         charges: List[Charge],
-        auto_send: bool = False
+        auto_send: bool = False,
+        commit: bool = True,
     ) -> Optional[Invoice]:
-        """Create invoice from load and charges; auto-send if requested."""
+        """Create invoice from load and charges; auto-send if requested.
+
+        With commit=False the invoice is only flushed so the caller can commit
+        it together with the charges. Errors then propagate instead of rolling
+        back the caller's work, and auto_send is ignored: the caller sends once
+        its transaction is committed.
+        """
         try:
             customer = load.customer
             
@@ -72,31 +81,45 @@ class InvoiceGenerator:
                     amount=charge.amount,
                 )
                 line_items.append(line_item)
-                charge.invoice_id = invoice.id
 
             self.db.add_all(line_items)
             invoice.line_items = line_items
-            invoice.charges = charges
+            charge_ids = [charge.id for charge in charges if charge.id is not None]
+            if charge_ids:
+                self.db.execute(
+                    update(Charge)
+                    .where(Charge.id.in_(charge_ids))
+                    .values(invoice_id=invoice.id)
+                )
             
-            self.db.commit()
+            if commit:
+                self.db.commit()
+            else:
+                self.db.flush()
             
             logger.info(
                 f"Created invoice {invoice_number} for load {load.id}, "
                 f"total: ${total_amount:.2f}"
             )
             
-            if auto_send and customer.auto_invoice:
+            if commit and auto_send and customer.auto_invoice:
                 self.send_to_customer(invoice)
             
             return invoice
             
         except Exception as e:
             logger.error(f"Error creating invoice: {e}")
+            if not commit:
+                raise
             self.db.rollback()
             return None
     
     def sync_to_quickbooks(self, invoice: Invoice) -> bool:
-        """Sync invoice to QuickBooks; returns True on success."""
+        """Sync invoice to QuickBooks from sync code; returns True on success."""
+        return run_sync(self.sync_to_quickbooks_async(invoice))
+    
+    async def sync_to_quickbooks_async(self, invoice: Invoice) -> bool:
+        """Sync invoice to QuickBooks from async code; returns True on success."""
         try:
             customer = invoice.customer
             
@@ -104,20 +127,9 @@ class InvoiceGenerator:
                 logger.warning(f"Customer {customer.id} not in QuickBooks, skipping sync")
                 return False
             
-            qb_line_items = []
-            for line_item in invoice.line_items:
-                qb_line_items.append(
-                    QBLineItem(
-                        description=line_item.description,
-                        quantity=line_item.quantity,
-                        unit_price=line_item.unit_price,
-                        amount=line_item.amount,
-                    )
-                )
-            
-            qb_invoice = self.qb_client.create_invoice(
+            qb_invoice = await self.qb_client.create_invoice(
                 customer_id=customer.quickbooks_customer_id,
-                line_items=qb_line_items,
+                line_items=self._qb_line_items(invoice),
                 invoice_date=invoice.invoice_date,
                 due_date=invoice.due_date,
                 doc_number=invoice.invoice_number,
@@ -137,18 +149,82 @@ class InvoiceGenerator:
             
         except Exception as e:
             logger.error(f"Error syncing invoice to QuickBooks: {e}")
+            self.db.rollback()
             return False
     
+    async def sync_invoices_to_quickbooks(self, invoices: List[Invoice]) -> int:
+        """Sync many invoices through QuickBooks batch requests; returns count synced.
+
+        Each batch is committed as soon as QuickBooks answers, so the IDs of
+        invoices created by earlier batches survive a later batch failing.
+        """
+        pending = [
+            invoice for invoice in invoices
+            if not invoice.quickbooks_invoice_id and invoice.customer.quickbooks_customer_id
+        ]
+        synced = 0
+        batch_size = self.qb_client.MAX_BATCH_ITEMS
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                payloads = {
+                    str(invoice.id): self.qb_client.build_invoice_payload(
+                        customer_id=invoice.customer.quickbooks_customer_id,
+                        line_items=self._qb_line_items(invoice),
+                        invoice_date=invoice.invoice_date,
+                        due_date=invoice.due_date,
+                        doc_number=invoice.invoice_number,
+                        memo=invoice.memo,
+                    )
+                    for invoice in batch
+                }
+                results = await self.qb_client.create_invoices_batch(payloads)
+                
+                batch_synced = 0
+                for invoice in batch:
+                    qb_invoice = results.get(str(invoice.id))
+                    if qb_invoice:
+                        invoice.quickbooks_invoice_id = qb_invoice.id
+                        invoice.quickbooks_sync_token = qb_invoice.sync_token
+                        invoice.status = InvoiceStatus.APPROVED
+                        batch_synced += 1
+                self.db.commit()
+                synced += batch_synced
+                
+            except Exception as e:
+                logger.error(f"Error batch syncing {len(batch)} invoices to QuickBooks: {e}")
+                self.db.rollback()
+        
+        if pending:
+            logger.info(f"Batch synced {synced}/{len(pending)} invoices to QuickBooks")
+        return synced
+    
+    def _qb_line_items(self, invoice: Invoice) -> List[QBLineItem]:
+        """Convert invoice line items to QuickBooks line items."""
+        return [
+            QBLineItem(
+                description=line_item.description,
+                quantity=line_item.quantity,
+                unit_price=line_item.unit_price,
+                amount=line_item.amount,
+            )
+            for line_item in invoice.line_items
+        ]
+    
     def send_to_customer(self, invoice: Invoice) -> bool:
+        """Send invoice to customer via QuickBooks from sync code; returns True on success."""
+        return run_sync(self.send_to_customer_async(invoice))
+    
+    async def send_to_customer_async(self, invoice: Invoice) -> bool:
         """Send invoice to customer via QuickBooks; returns True on success."""
         try:
             if not invoice.quickbooks_invoice_id:
-                if not self.sync_to_quickbooks(invoice):
+                if not await self.sync_to_quickbooks_async(invoice):
                     logger.error("Failed to sync invoice before sending")
                     return False
             
             customer = invoice.customer
-            success = self.qb_client.send_invoice(
+            success = await self.qb_client.send_invoice(
                 invoice_id=invoice.quickbooks_invoice_id,
                 email_address=customer.email or customer.alert_email,
             )
@@ -168,12 +244,16 @@ class InvoiceGenerator:
             return False
     
     def check_payment_status(self, invoice: Invoice) -> bool:
+        """Sync payment status from QuickBooks from sync code; returns True if status was updated."""
+        return run_sync(self.check_payment_status_async(invoice))
+    
+    async def check_payment_status_async(self, invoice: Invoice) -> bool:
         """Sync payment status from QuickBooks; returns True if status was updated."""
         try:
             if not invoice.quickbooks_invoice_id:
                 return False
             
-            qb_invoice = self.qb_client.get_invoice(invoice.quickbooks_invoice_id)
+            qb_invoice = await self.qb_client.get_invoice(invoice.quickbooks_invoice_id)
             if not qb_invoice:
                 return False
             old_balance = invoice.balance_due
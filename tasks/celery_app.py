@@ -6,6 +6,13 @@ from config import get_settings
 
 settings = get_settings()
 
+celery_app = Celery(
+    "billing_agent",
+    broker=settings.redis_url,
+    backend=settings.redis_url,
+    include=["tasks.celery_tasks"],
+)
+
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
@@ -1,19 +1,30 @@
 """Celery background tasks."""
+import asyncio
 import logging
+from typing import List
 from datetime import datetime, date
 
+from sqlalchemy.orm import joinedload, selectinload
+
 from tasks.celery_app import celery_app
 from models.database import db_session
 from models import Load, Container, Invoice, InvoiceStatus, Customer, Alert, AlertStatus
 from integrations.mcleod_client import McLeodClient
+from integrations.terminal49_client import close_http_client
 from agents.tracking_agent import TrackingAgent
 from agents.billing_agent import BillingAgent
-from services.alert_service import AlertService
 from services.invoice_generator import InvoiceGenerator
 
 logger = logging.getLogger(__name__)
 
 
+async def _refresh_container_statuses(tracking_agent: TrackingAgent, containers: List[Container]) -> int:
+    try:
+        return await tracking_agent.update_container_statuses(containers)
+    finally:
+        await close_http_client()
+
+
 @celery_app.task(name="tasks.celery_tasks.sync_mcleod_loads")
 def sync_mcleod_loads():
     """Sync new loads from McLeod LoadMaster."""
@@ -85,14 +96,7 @@ def update_container_statuses():
                 .filter(Container.is_tracking_active == True, Container.returned_empty.is_(None))
                 .all()
             )
-            tracking_agent = TrackingAgent(db)
-            updated = 0
-            for container in containers:
-                try:
-                    if tracking_agent.update_container_status(container):
-                        updated += 1
-                except Exception as e:
-                    logger.error(f"Error updating container {container.id}: {e}")
+            updated = asyncio.run(_refresh_container_statuses(TrackingAgent(db), containers))
 
             logger.info(f"Container status update complete: {updated} containers updated")
             return {"updated": updated, "total": len(containers)}
@@ -110,18 +114,20 @@ def check_and_send_alerts():
             logger.info("Checking for alerts")
             containers = (
                 db.query(Container)
+                .options(joinedload(Container.load).joinedload(Load.customer))
                 .filter(Container.is_tracking_active == True, Container.returned_empty.is_(None))
                 .all()
             )
             tracking_agent = TrackingAgent(db)
-            alert_service = AlertService(db)
+            alert_service = tracking_agent.alert_service
             alerts_created = 0
             for container in containers:
                 try:
-                    alerts_created += len(tracking_agent.check_alerts(container))
+                    alerts_created += len(tracking_agent.check_alerts(container, flush=False))
                 except Exception as e:
                     logger.error(f"Error checking alerts for container {container.id}: {e}")
 
+            alert_service.flush()
             alerts_sent = alert_service.send_pending_alerts()
             logger.info(f"Alert check complete: {alerts_created} alerts created, {alerts_sent} alerts sent")
             return {"alerts_created": alerts_created, "alerts_sent": alerts_sent}
@@ -133,29 +139,48 @@ def check_and_send_alerts():
 
 @celery_app.task(name="tasks.celery_tasks.process_pending_invoices")
 def process_pending_invoices():
-    """Process loads ready for billing."""
+    """Process loads ready for billing.
+
+    Loads of customers without auto-invoicing only get their charges recorded,
+    once, for manual invoicing.
+    """
     with db_session() as db:
         try:
             logger.info("Processing pending invoices")
             loads = (
                 db.query(Load)
+                .options(selectinload(Load.charges), joinedload(Load.customer))
                 .filter(Load.status == "delivered", Load.actual_delivery_date.isnot(None))
                 .all()
             )
+            unbilled = [
+                load for load in loads
+                if not any(c.invoice_id is not None for c in load.charges)
+            ]
             billing_agent = BillingAgent(db)
-            invoices_created = 0
-            for load in loads:
-                if load.charges and any(c.invoice_id is not None for c in load.charges):
-                    continue
-                try:
-                    invoice = billing_agent.process_load_billing(load, auto_approve=False)
-                    if invoice:
-                        invoices_created += 1
-                except Exception as e:
-                    logger.error(f"Error processing billing for load {load.id}: {e}")
+            results = billing_agent.batch_process_loads(
+                [load.id for load in unbilled if load.customer.auto_invoice], auto_send=False
+            )
+            invoices_created = sum(1 for r in results if isinstance(r, int))
+
+            charge_only_ids = [
+                load.id for load in unbilled
+                if not load.customer.auto_invoice and not load.charges
+            ]
+            charge_results = billing_agent.batch_process_loads(
+                charge_only_ids, auto_send=False, persist_charges_only=True
+            )
+            charges_recorded = sum(1 for r in charge_results if not isinstance(r, BaseException))
 
-            logger.info(f"Invoice processing complete: {invoices_created} invoices created")
-            return {"invoices_created": invoices_created, "loads_processed": len(loads)}
+            logger.info(
+                f"Invoice processing complete: {invoices_created} invoices created, "
+                f"charges recorded for {charges_recorded} loads without auto-invoicing"
+            )
+            return {
+                "invoices_created": invoices_created,
+                "charges_recorded": charges_recorded,
+                "loads_processed": len(loads),
+            }
 
         except Exception as e:
             logger.error(f"Error processing invoices: {e}")
@@ -0,0 +1,94 @@
+"""Shared test fixtures."""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="billing-agent-tests-")
+
+os.environ.setdefault("APP_ENV", "testing")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TEST_DB_DIR}/test.db")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+for _name in (
+    "SECRET_KEY",
+    "API_KEY",
+    "WEBHOOK_BASE_URL",
+    "MCLEOD_API_URL",
+    "MCLEOD_API_TOKEN",
+    "MCLEOD_COMPANY_ID",
+    "TERMINAL49_API_KEY",
+    "TERMINAL49_WEBHOOK_SECRET",
+    "QUICKBOOKS_CLIENT_ID",
+    "QUICKBOOKS_CLIENT_SECRET",
+    "QUICKBOOKS_REALM_ID",
+    "QUICKBOOKS_REDIRECT_URI",
+    "ANTHROPIC_API_KEY",
+):
+    os.environ.setdefault(_name, "test")
+
+import pytest
+
+from models import Container, Customer, Load
+from models.database import Base, SessionLocal, engine
+
+
+@pytest.fixture
+def db_session():
+    """Session on a freshly created schema; SessionLocal sessions see the same database."""
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def make_customer(db_session):
+    """Create and commit a customer; keyword arguments override the defaults."""
+    created = []
+
+    def _make(**fields):
+        number = len(created) + 1
+        customer = Customer(**{
+            "mcleod_customer_id": f"CUST{number:03d}",
+            "name": f"Test Customer {number}",
+            **fields,
+        })
+        db_session.add(customer)
+        db_session.commit()
+        created.append(customer)
+        return customer
+
+    return _make
+
+
+@pytest.fixture
+def make_load(db_session, make_customer):
+    """Create and commit a load, for a new customer unless one is given."""
+    created = []
+
+    def _make(customer=None, container=False, **fields):
+        number = len(created) + 1
+        customer = customer or make_customer()
+        load = Load(**{
+            "mcleod_order_id": f"ORD{number:03d}",
+            "mcleod_load_number": f"LOAD{number:03d}",
+            "customer_id": customer.id,
+            "base_freight_rate": 500.0,
+            **fields,
+        })
+        db_session.add(load)
+        db_session.flush()
+        if container:
+            db_session.add(Container(
+                container_number=f"TEST{number:07d}",
+                load_id=load.id,
+                vessel_discharged=datetime.utcnow() - timedelta(days=10),
+                picked_up=datetime.utcnow() - timedelta(days=8),
+            ))
+        db_session.commit()
+        created.append(load)
+        return load
+
+    return _make
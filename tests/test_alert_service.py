@@ -0,0 +1,45 @@
+"""Tests for alert service."""
+import pytest
+
+from models import Alert, AlertType
+from services.alert_service import AlertService
+
+
+@pytest.fixture
+def container(make_customer, make_load):
+    """Create a picked-up container on a load for an alerting customer."""
+    load = make_load(make_customer(email="ops@example.com"), container=True)
+    return load.container
+
+
+def test_queued_alerts_are_saved_by_flush(db_session, container):
+    """Test queued alerts stay unsaved until flush() commits them together."""
+    service = AlertService(db_session)
+    customer = container.load.customer
+
+    service.queue_per_diem_alert(container, customer, hours_until=12)
+    service.queue_charge_accruing_alert(container, customer, "per_diem", 100.0)
+    service.queue_charge_accruing_alert(container, customer, "demurrage", 150.0)
+    assert db_session.query(Alert).count() == 0
+
+    assert service.flush() == 3
+    assert service.flush() == 0
+    assert sorted(alert.alert_type.value for alert in db_session.query(Alert)) == [
+        "charge_accruing", "charge_accruing", "per_diem_warning",
+    ]
+
+
+def test_queue_dedupes_per_container_and_type(db_session, container):
+    """Test a container gets one open per diem alert across queue and database."""
+    service = AlertService(db_session)
+    customer = container.load.customer
+
+    first = service.queue_per_diem_alert(container, customer, hours_until=12)
+    assert service.queue_per_diem_alert(container, customer, hours_until=6) is first
+    accruing = service.queue_charge_accruing_alert(container, customer, "per_diem", 100.0)
+    assert service.queue_charge_accruing_alert(container, customer, "per_diem", 100.0) is accruing
+    service.flush()
+
+    service.queue_per_diem_alert(container, customer, hours_until=6)
+    assert service.flush() == 0
+    assert db_session.query(Alert).filter(Alert.alert_type == AlertType.PER_DIEM_WARNING).count() == 1
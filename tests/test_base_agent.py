@@ -0,0 +1,85 @@
+"""Tests for base agent LLM plumbing."""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from anthropic import AsyncAnthropic
+
+from agents import base_agent
+from agents.base_agent import BaseAgent
+from agents.llm_cache import MemoryLLMCache
+
+
+def _batch(status: str) -> SimpleNamespace:
+    return SimpleNamespace(id="batch-1", processing_status=status)
+
+
+def _entry(custom_id: str, text: str = None) -> SimpleNamespace:
+    if text is None:
+        return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="errored"))
+    message = SimpleNamespace(content=[SimpleNamespace(text=text)])
+    return SimpleNamespace(
+        custom_id=custom_id, result=SimpleNamespace(type="succeeded", message=message)
+    )
+
+
+async def _entries(*entries):
+    for entry in entries:
+        yield entry
+
+
+def test_invoke_llm_batch_uses_messages_batches(monkeypatch):
+    """Test batch prompts go through the pinned SDK's client.messages.batches."""
+    client = AsyncAnthropic(api_key="test")
+    batches = client.messages.batches
+    monkeypatch.setattr(batches, "create", AsyncMock(return_value=_batch("in_progress")))
+    monkeypatch.setattr(batches, "retrieve", AsyncMock(return_value=_batch("ended")))
+    monkeypatch.setattr(
+        batches, "results", AsyncMock(return_value=_entries(_entry("a", "YES"), _entry("b")))
+    )
+    monkeypatch.setattr(base_agent.settings, "llm_batch_poll_interval", 0)
+    agent = BaseAgent(db=None)
+    agent.client = client
+
+    results = asyncio.run(agent._invoke_llm_batch({"a": ("system", "one"), "b": ("system", "two")}))
+
+    assert results == {"a": "YES", "b": None}
+    requests = batches.create.await_args.kwargs["requests"]
+    assert [request["custom_id"] for request in requests] == ["a", "b"]
+    batches.retrieve.assert_awaited_once_with("batch-1")
+
+
+
+@pytest.fixture
+def cached_agent(monkeypatch):
+    """Agent with a fresh memory cache and a Messages API double that always answers "answer"."""
+    agent = BaseAgent(db=None)
+    response = SimpleNamespace(
+        content=[SimpleNamespace(type="text", text="answer")],
+        usage=SimpleNamespace(input_tokens=10, output_tokens=2),
+    )
+    agent.client = SimpleNamespace(messages=SimpleNamespace(create=AsyncMock(return_value=response)))
+    monkeypatch.setattr(agent, "response_cache", MemoryLLMCache())
+    return agent
+
+
+def test_deterministic_calls_are_served_from_response_cache(cached_agent):
+    """Test a repeated temperature-0 prompt calls the API once."""
+    async def _twice():
+        return [await cached_agent._invoke_llm("system", "same prompt", temperature=0) for _ in range(2)]
+
+    assert asyncio.run(_twice()) == ["answer", "answer"]
+    cached_agent.client.messages.create.assert_awaited_once()
+
+
+def test_sampled_calls_bypass_cache_unless_ttl_given(cached_agent):
+    """Test non-zero temperature calls are cached only with an explicit cache_ttl."""
+    async def _calls():
+        for _ in range(2):
+            await cached_agent._invoke_llm("system", "creative", temperature=0.7)
+        for _ in range(2):
+            await cached_agent._invoke_llm("system", "creative", temperature=0.7, cache_ttl=60)
+
+    asyncio.run(_calls())
+    assert cached_agent.client.messages.create.await_count == 3
@@ -0,0 +1,159 @@
+"""Tests for billing agent."""
+import asyncio
+import pytest
+from datetime import date
+
+from agents import billing_agent
+from agents.billing_agent import BillingAgent
+from exceptions import LoadNotFoundError
+from models import Charge, ChargeType, Invoice
+
+
+@pytest.fixture
+def sample_load(make_load):
+    return make_load()
+
+
+def _base_freight(load):
+    return Charge(
+        load_id=load.id,
+        charge_type=ChargeType.BASE_FREIGHT,
+        description="Base freight",
+        rate=500.0,
+        amount=500.0,
+    )
+
+
+def _per_diem(load, start_date):
+    return Charge(
+        load_id=load.id,
+        charge_type=ChargeType.PER_DIEM,
+        description="Per diem",
+        rate=100.0,
+        quantity=2,
+        amount=200.0,
+        start_date=start_date,
+        end_date=start_date,
+    )
+
+
+def test_save_charges_returns_inserted_rows(db_session, sample_load):
+    """Test a first save inserts every charge."""
+    agent = BillingAgent(db_session)
+
+    saved = agent._save_charges([_base_freight(sample_load), _per_diem(sample_load, date(2024, 1, 5))])
+    db_session.commit()
+
+    assert len(saved) == 2
+    assert all(charge.id for charge in saved)
+    assert db_session.query(Charge).count() == 2
+
+
+def test_save_charges_retry_skips_charges_without_start_date(db_session, sample_load):
+    """Test retrying a load does not duplicate base freight, whose start date is NULL."""
+    agent = BillingAgent(db_session)
+    agent._save_charges([_base_freight(sample_load)])
+    db_session.commit()
+
+    agent._save_charges([_base_freight(sample_load)])
+    db_session.commit()
+
+    freight = db_session.query(Charge).filter(Charge.charge_type == ChargeType.BASE_FREIGHT).all()
+    assert len(freight) == 1
+    assert freight[0].start_date is None
+    assert freight[0].idempotency_key == f"{sample_load.id}:base_freight:-"
+
+
+def test_save_charges_conflict_returns_load_uninvoiced_charges(db_session, sample_load):
+    """Test a partially conflicting save re-selects the load's uninvoiced charges."""
+    agent = BillingAgent(db_session)
+    agent._save_charges([_base_freight(sample_load), _per_diem(sample_load, date(2024, 1, 5))])
+    db_session.commit()
+
+    saved = agent._save_charges([
+        _base_freight(sample_load),
+        _per_diem(sample_load, date(2024, 1, 5)),
+        _per_diem(sample_load, date(2024, 1, 7)),
+    ])
+    db_session.commit()
+
+    assert db_session.query(Charge).count() == 3
+    assert sorted(charge.idempotency_key for charge in saved) == sorted([
+        f"{sample_load.id}:base_freight:-",
+        f"{sample_load.id}:per_diem:2024-01-05",
+        f"{sample_load.id}:per_diem:2024-01-07",
+    ])
+
+
+def test_save_charges_without_on_conflict_support_skips_saved_keys(db_session, sample_load, monkeypatch):
+    """Test dialects without ON CONFLICT fall back to a pre-checked ORM insert."""
+    monkeypatch.setattr(billing_agent, "_INSERT_BY_DIALECT", {})
+    agent = BillingAgent(db_session)
+    agent._save_charges([_base_freight(sample_load)])
+    db_session.commit()
+
+    saved = agent._save_charges([
+        _base_freight(sample_load),
+        _per_diem(sample_load, date(2024, 1, 5)),
+        _per_diem(sample_load, date(2024, 1, 5)),
+    ])
+    db_session.commit()
+
+    assert db_session.query(Charge).count() == 2
+    assert sorted(charge.idempotency_key for charge in saved) == [
+        f"{sample_load.id}:base_freight:-",
+        f"{sample_load.id}:per_diem:2024-01-05",
+    ]
+
+
+def test_create_invoice_without_commit_reraises_and_keeps_charges(db_session, sample_load, monkeypatch):
+    """Test an invoice error under commit=False propagates without rolling back the caller."""
+    agent = BillingAgent(db_session)
+    charges = agent._save_charges([_base_freight(sample_load)])
+
+    def _fail(*args, **kwargs):
+        raise RuntimeError("numbering failed")
+
+    monkeypatch.setattr(agent.invoice_generator, "_generate_invoice_number", _fail)
+    with pytest.raises(RuntimeError):
+        agent.invoice_generator.create_invoice_from_load(sample_load, charges, commit=False)
+
+    db_session.commit()
+    assert db_session.query(Charge).count() == 1
+
+
+def test_process_load_billing_sends_after_commit(db_session, sample_load, monkeypatch):
+    """Test auto_send happens only once charges and invoice are committed."""
+    agent = BillingAgent(db_session)
+    events = []
+    commit = db_session.commit
+    monkeypatch.setattr(db_session, "commit", lambda: (events.append("commit"), commit()))
+    monkeypatch.setattr(
+        agent.invoice_generator, "send_to_customer", lambda invoice: events.append("send") or True
+    )
+
+    invoice = agent.process_load_billing(sample_load, auto_send=True, sync_quickbooks=False)
+
+    assert invoice is not None
+    assert events == ["commit", "send"]
+
+
+def test_flush_quickbooks_refuses_running_loop(db_session):
+    """Test flushing from inside an event loop raises instead of being swallowed."""
+    agent = BillingAgent(db_session)
+
+    async def _flush():
+        agent.flush_quickbooks([])
+
+    with pytest.raises(RuntimeError, match="running event loop"):
+        asyncio.run(_flush())
+
+
+
+def test_batch_process_loads_reports_each_load(db_session, sample_load):
+    """Test batch billing returns an invoice ID or the exception for every load."""
+    results = BillingAgent(db_session).batch_process_loads([sample_load.id, 999_999], auto_send=False)
+
+    assert isinstance(results[0], int)
+    assert isinstance(results[1], LoadNotFoundError)
+    assert db_session.get(Invoice, results[0]).customer_id == sample_load.customer_id
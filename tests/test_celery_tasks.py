@@ -0,0 +1,25 @@
+"""Tests for Celery background tasks."""
+from datetime import date
+
+from models import Charge, Invoice
+from tasks.celery_tasks import process_pending_invoices
+
+
+def test_process_pending_invoices_records_charges_for_manual_customers(db_session, make_customer, make_load):
+    """Test loads of customers without auto-invoicing get charges once and no invoice."""
+    delivered = {"container": True, "status": "delivered", "actual_delivery_date": date(2024, 1, 10)}
+    auto_load = make_load(make_customer(auto_invoice=True), **delivered)
+    manual_load = make_load(make_customer(auto_invoice=False), **delivered)
+
+    first = process_pending_invoices()
+    second = process_pending_invoices()
+
+    assert first["invoices_created"] == 1
+    assert first["charges_recorded"] == 1
+    assert second["charges_recorded"] == 0
+    manual_charges = db_session.query(Charge).filter(Charge.load_id == manual_load.id).all()
+    assert manual_charges
+    assert all(charge.invoice_id is None for charge in manual_charges)
+    assert db_session.query(Invoice).count() == 1
+    auto_charges = db_session.query(Charge).filter(Charge.load_id == auto_load.id).all()
+    assert auto_charges and all(charge.invoice_id is not None for charge in auto_charges)
@@ -0,0 +1,23 @@
+"""Tests for date helpers."""
+from datetime import date, datetime, timedelta, timezone
+
+from utils.date_helpers import to_iso
+
+
+def test_to_iso_keeps_offset_of_equal_aware_datetimes():
+    """Equal instants in different zones keep their own offset."""
+    utc = datetime(2024, 1, 15, 12, 0, tzinfo=timezone.utc)
+    eastern = datetime(2024, 1, 15, 7, 0, tzinfo=timezone(timedelta(hours=-5)))
+    assert utc == eastern
+
+    assert to_iso(utc) == "2024-01-15T12:00:00+00:00"
+    assert to_iso(eastern) == "2024-01-15T07:00:00-05:00"
+
+
+def test_to_iso_dates_and_none():
+    """Dates format as ISO dates and None passes through."""
+    assert to_iso(date(2024, 1, 15)) == "2024-01-15"
+    assert to_iso(date(2024, 1, 15)) == "2024-01-15"
+    assert to_iso(datetime(2024, 1, 15, 8, 30)) == "2024-01-15T08:30:00"
+    assert to_iso(None) is None
+
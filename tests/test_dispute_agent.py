@@ -0,0 +1,130 @@
+"""Tests for dispute agent rules, prescreens and batching."""
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from agents.dispute_agent import DisputeAgent, DisputeSentiment, SentimentAnalysis
+
+
+@pytest.fixture
+def agent():
+    return DisputeAgent(db=None)
+
+
+@pytest.mark.parametrize("complaint", [
+    "There was a typo in the PO number on this invoice.",
+    "Minor inconvenience: the delivery window slipped by an hour.",
+    "The driver was a little late, which cost us a $45 lumper fee.",
+])
+def test_goodwill_rule_prices_clear_minor_complaints(agent, complaint):
+    """Test complaints above the confidence gate get the rule-based credit."""
+    credit = agent._goodwill_rule_check(1000.0, complaint, customer_lifetime_value=100_000.0)
+
+    assert credit == 50.0
+
+
+@pytest.mark.parametrize("complaint", [
+    "The driver was late and you billed us $4,800 in detention.",
+    "Delivery was delayed again.",
+    "Minor issue, but the $1,200 demurrage charge is wrong.",
+    "This is unacceptable, we will take you to small claims.",
+    "Why was this invoice so high?",
+])
+def test_goodwill_rule_defers_ambiguous_complaints(agent, complaint):
+    """Test complaints below the confidence gate are left to the LLM."""
+    assert agent._goodwill_rule_check(1000.0, complaint, customer_lifetime_value=100_000.0) is None
+
+
+def test_goodwill_rule_requires_lifetime_value(agent):
+    """Test the rule never fires without a customer lifetime value to cap the credit."""
+    assert agent._goodwill_rule_check(1000.0, "Small typo on the invoice.", None) is None
+
+
+def test_sentiment_prescreen_flags_threats_without_llm(agent, monkeypatch):
+    """Test explicit legal threats are classified by the regex prescreen alone."""
+    llm = AsyncMock()
+    monkeypatch.setattr(agent, "_invoke_llm_structured", llm)
+
+    result = asyncio.run(agent.analyze_dispute_sentiment(
+        "Pay this back or we will contact our attorney and file a chargeback."
+    ))
+
+    llm.assert_not_called()
+    analysis = result["sentiment_analysis"]
+    assert analysis["sentiment"] == DisputeSentiment.THREATENING.value
+    assert analysis["urgency"] == "critical"
+    assert analysis["key_concerns"] == ["contact our attorney", "file a chargeback"]
+
+
+@pytest.mark.parametrize("message, hints", [
+    ("Sue from AP asked for a copy of the BOL.", "sue"),
+    ("Our attorney reviewed the contract and it's fine.", "attorney"),
+    ("Please cancel the duplicate invoice.", "cancel"),
+])
+def test_sentiment_prescreen_passes_single_words_to_llm_as_hints(agent, monkeypatch, message, hints):
+    """Test lone threat words are judged by the LLM instead of escalating."""
+    llm = AsyncMock(return_value=SentimentAnalysis(
+        sentiment=DisputeSentiment.NEUTRAL, urgency="low"
+    ))
+    monkeypatch.setattr(agent, "_invoke_llm_structured", llm)
+
+    result = asyncio.run(agent.analyze_dispute_sentiment(message))
+
+    llm.assert_awaited_once()
+    assert llm.await_args.kwargs["human_message"].endswith(f"judge them in context: {hints}")
+    assert result["sentiment_analysis"]["sentiment"] == DisputeSentiment.NEUTRAL.value
+
+
+def test_sentiment_without_threat_words_sends_plain_prompt(agent, monkeypatch):
+    """Test messages without threat words reach the LLM with no hints."""
+    llm = AsyncMock(return_value=SentimentAnalysis(
+        sentiment=DisputeSentiment.FRUSTRATED, urgency="medium"
+    ))
+    monkeypatch.setattr(agent, "_invoke_llm_structured", llm)
+
+    result = asyncio.run(agent.analyze_dispute_sentiment("Why was detention billed twice?"))
+
+    assert "threat terms" not in llm.await_args.kwargs["human_message"]
+    assert result["sentiment_analysis"]["urgency"] == "medium"
+
+
+def _overdue_invoice(invoice_id):
+    return SimpleNamespace(
+        id=invoice_id,
+        invoice_number=f"INV-{invoice_id}",
+        customer=SimpleNamespace(name="Acme Logistics"),
+        total_amount=500.0,
+        balance_due=500.0,
+        due_date=date(2024, 1, 1),
+        payment_terms="Net 30",
+    )
+
+
+def test_collections_emails_run_concurrently_by_default(agent, monkeypatch):
+    """Test the batch API is opt-in, leaving interactive callers on direct calls."""
+    batch = AsyncMock()
+    monkeypatch.setattr(agent, "_invoke_llm_batch", batch)
+    monkeypatch.setattr(agent, "_invoke_llm", AsyncMock(return_value="Please pay."))
+
+    results = asyncio.run(agent.draft_collections_emails([(_overdue_invoice(1), 10)]))
+
+    batch.assert_not_called()
+    assert results[0]["email_draft"] == "Please pay."
+
+
+def test_collections_batch_keeps_duplicate_invoices_apart(agent, monkeypatch):
+    """Test each batch item gets its own custom_id even when an invoice repeats."""
+    invoice = _overdue_invoice(7)
+    batch = AsyncMock(return_value={"0-7": "Reminder", "1-7": "Final notice"})
+    monkeypatch.setattr(agent, "_invoke_llm_batch", batch)
+
+    results = asyncio.run(agent.draft_collections_emails(
+        [(invoice, 5), (invoice, 45)], use_batch_api=True
+    ))
+
+    assert list(batch.await_args.args[0]) == ["0-7", "1-7"]
+    assert [r["email_draft"] for r in results] == ["Reminder", "Final notice"]
+    assert [r["days_overdue"] for r in results] == [5, 45]
@@ -0,0 +1,112 @@
+"""Tests for invoice generator."""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from integrations.quickbooks_client import QBInvoice
+from models import Invoice, InvoiceLineItem, InvoiceStatus
+from services.invoice_generator import InvoiceGenerator
+
+
+def _qb_invoice(qb_id: str, doc_number: str) -> QBInvoice:
+    return QBInvoice(
+        id=qb_id,
+        doc_number=doc_number,
+        customer_id="QB-CUST",
+        total_amount=500.0,
+        balance=500.0,
+        status="Open",
+        sync_token="0",
+    )
+
+
+@pytest.fixture
+def qb_client():
+    """QuickBooks client double with async API methods."""
+    client = MagicMock()
+    client.create_invoice = AsyncMock(side_effect=lambda **kw: _qb_invoice("QB-1", kw["doc_number"]))
+    client.send_invoice = AsyncMock(return_value=True)
+    return client
+
+
+@pytest.fixture
+def sample_invoice(db_session, make_customer):
+    """Create a draft invoice for a QuickBooks customer."""
+    customer = make_customer(email="billing@example.com", quickbooks_customer_id="QB-CUST")
+
+    invoice = Invoice(
+        invoice_number="INV-202401-00001",
+        customer_id=customer.id,
+        subtotal=500.0,
+        total_amount=500.0,
+        balance_due=500.0,
+        status=InvoiceStatus.DRAFT,
+    )
+    db_session.add(invoice)
+    db_session.flush()
+    db_session.add(InvoiceLineItem(
+        invoice_id=invoice.id, item_number=1, description="Base freight",
+        quantity=1, unit_price=500.0, amount=500.0,
+    ))
+    db_session.commit()
+    return invoice
+
+
+def test_sync_to_quickbooks_awaits_client(db_session, sample_invoice, qb_client):
+    """Test the sync entry point runs the async QuickBooks call to completion."""
+    generator = InvoiceGenerator(db_session, qb_client=qb_client)
+
+    assert generator.sync_to_quickbooks(sample_invoice) is True
+    qb_client.create_invoice.assert_awaited_once()
+    assert sample_invoice.quickbooks_invoice_id == "QB-1"
+    assert sample_invoice.status == InvoiceStatus.APPROVED
+
+
+def test_send_to_customer_syncs_then_sends(db_session, sample_invoice, qb_client):
+    """Test sending an unsynced invoice creates it in QuickBooks first."""
+    generator = InvoiceGenerator(db_session, qb_client=qb_client)
+
+    assert generator.send_to_customer(sample_invoice) is True
+    qb_client.send_invoice.assert_awaited_once_with(
+        invoice_id="QB-1", email_address="billing@example.com"
+    )
+    assert sample_invoice.status == InvoiceStatus.SENT
+
+
+def test_sync_entry_point_refuses_running_loop(db_session, sample_invoice, qb_client):
+    """Test the sync wrapper raises instead of nesting event loops."""
+    generator = InvoiceGenerator(db_session, qb_client=qb_client)
+
+    async def _call():
+        generator.sync_to_quickbooks(sample_invoice)
+
+    with pytest.raises(RuntimeError, match="running event loop"):
+        asyncio.run(_call())
+    qb_client.create_invoice.assert_not_called()
+
+
+def test_sync_invoices_to_quickbooks_keeps_earlier_batches(db_session, sample_invoice, qb_client):
+    """Test a failing batch does not discard QuickBooks IDs from earlier batches."""
+    second = Invoice(
+        invoice_number="INV-202401-00002",
+        customer_id=sample_invoice.customer_id,
+        total_amount=250.0,
+        status=InvoiceStatus.DRAFT,
+    )
+    db_session.add(second)
+    db_session.commit()
+
+    qb_client.MAX_BATCH_ITEMS = 1
+    qb_client.build_invoice_payload = MagicMock(return_value={})
+    qb_client.create_invoices_batch = AsyncMock(side_effect=[
+        {str(sample_invoice.id): _qb_invoice("QB-1", sample_invoice.invoice_number)},
+        RuntimeError("batch request failed"),
+    ])
+    generator = InvoiceGenerator(db_session, qb_client=qb_client)
+
+    synced = asyncio.run(generator.sync_invoices_to_quickbooks([sample_invoice, second]))
+
+    assert synced == 1
+    db_session.expire_all()
+    assert sample_invoice.quickbooks_invoice_id == "QB-1"
+    assert second.quickbooks_invoice_id is None
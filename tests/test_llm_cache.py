@@ -0,0 +1,65 @@
+"""Tests for LLM response caches."""
+import asyncio
+
+from agents import llm_cache
+from agents.llm_cache import MemoryLLMCache, RedisLLMCache
+
+
+def test_memory_cache_expires_entries_after_ttl(monkeypatch):
+    """Test entries are served until their TTL passes, then dropped."""
+    now = [100.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+    cache = MemoryLLMCache()
+
+    asyncio.run(cache.set("key", "value", ttl=10))
+    now[0] = 109.0
+    assert asyncio.run(cache.get("key")) == "value"
+    now[0] = 110.0
+    assert asyncio.run(cache.get("key")) is None
+    assert "key" not in cache._entries
+
+
+def test_memory_cache_evicts_oldest_entry_when_full():
+    """Test a full cache drops its oldest entry, but overwriting a key evicts nothing."""
+    cache = MemoryLLMCache(max_entries=2)
+
+    async def _fill():
+        await cache.set("a", "1", ttl=60)
+        await cache.set("b", "2", ttl=60)
+        await cache.set("b", "2b", ttl=60)
+        await cache.set("c", "3", ttl=60)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(_fill()) == [None, "2b", "3"]
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def get(self, key):
+        assert asyncio.get_running_loop() is self.loop
+        return None
+
+    async def set(self, key, value, ex=None):
+        assert asyncio.get_running_loop() is self.loop
+
+
+def test_redis_cache_uses_one_client_per_event_loop(monkeypatch):
+    """Test each asyncio.run gets its own client instead of reusing a pool from a closed loop."""
+    created = []
+
+    def _from_url(url, **kwargs):
+        created.append(_FakeRedis())
+        return created[-1]
+
+    monkeypatch.setattr(llm_cache.Redis, "from_url", _from_url)
+    cache = RedisLLMCache("redis://localhost:6379/15")
+
+    async def _roundtrip():
+        await cache.set("key", "value", ttl=60)
+        return await cache.get("key")
+
+    assert asyncio.run(_roundtrip()) is None
+    assert asyncio.run(_roundtrip()) is None
+    assert len(created) == 2
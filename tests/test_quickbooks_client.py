@@ -0,0 +1,50 @@
+"""Tests for QuickBooks client."""
+import asyncio
+import functools
+import json
+
+import httpx
+
+from integrations.quickbooks_client import QuickBooksClient
+
+
+def _invoice_response(batch_id: str) -> dict:
+    return {
+        "bId": batch_id,
+        "Invoice": {
+            "Id": f"QB-{batch_id}",
+            "DocNumber": f"DOC-{batch_id}",
+            "CustomerRef": {"value": "QB-CUST"},
+            "TotalAmt": "100.00",
+            "Balance": "100.00",
+            "SyncToken": "0",
+        },
+    }
+
+
+def test_create_invoices_batch_keeps_results_of_successful_chunks(monkeypatch):
+    """Test one failing batch request leaves the other chunks' invoices in the result."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 2:
+            return httpx.Response(500, request=request)
+        items = json.loads(request.content)
+        return httpx.Response(200, json={
+            "BatchItemResponse": [_invoice_response(item["bId"]) for item in items["BatchItemRequest"]]
+        })
+
+    monkeypatch.setattr(
+        httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    )
+    client = QuickBooksClient()
+    client.set_access_token("token")
+    client.MAX_BATCH_ITEMS = 2
+    payloads = {str(i): {"DocNumber": str(i)} for i in range(5)}
+
+    results = asyncio.run(client.create_invoices_batch(payloads))
+
+    assert len(requests) == 3
+    assert [batch_id for batch_id, invoice in results.items() if invoice] == ["0", "1", "4"]
+    assert results["2"] is None and results["3"] is None
@@ -0,0 +1,28 @@
+"""Tests for repositories."""
+from sqlalchemy import event
+
+from models import Customer
+from repositories.customer_repository import CustomerRepository
+
+
+def test_bulk_create_inserts_and_reloads_in_batched_statements(db_session):
+    """Test bulk_create issues one INSERT and one SELECT rather than per-row statements."""
+    statements = []
+    bind = db_session.get_bind()
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(bind, "before_cursor_execute", _record)
+    try:
+        created = CustomerRepository(db_session).bulk_create([
+            {"mcleod_customer_id": f"BULK{i:03d}", "name": f"Bulk Customer {i}"}
+            for i in range(5)
+        ])
+    finally:
+        event.remove(bind, "before_cursor_execute", _record)
+
+    assert [customer.mcleod_customer_id for customer in created] == [f"BULK{i:03d}" for i in range(5)]
+    assert statements.count("INSERT") == 1
+    assert statements.count("SELECT") == 1
+    assert db_session.query(Customer).count() == 5
@@ -0,0 +1,94 @@
+"""Tests for tracking agent pre-pull rules."""
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from agents.tracking_agent import PrepullDecision, TrackingAgent
+from models import Alert
+
+
+@pytest.fixture
+def agent():
+    return TrackingAgent(db=None)
+
+
+def _container(**overrides):
+    fields = {
+        "container_number": "TEST1234567",
+        "location": "Terminal 1",
+        "picked_up": None,
+        "available_for_pickup": datetime(2024, 1, 1, 8, 0),
+        "holds": None,
+        "last_free_day": None,
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+@pytest.mark.parametrize("container, days, savings, expected", [
+    (_container(picked_up=datetime(2024, 1, 2)), 0, 225.0, False),
+    (_container(available_for_pickup=None), 0, 225.0, False),
+    (_container(), 0, -10.0, False),
+    (_container(holds={"customs": True}), 0, 225.0, None),
+    (_container(), None, 225.0, None),
+    (_container(), 1, 225.0, True),
+    (_container(), 5, 225.0, False),
+    (_container(), 3, 225.0, None),
+])
+def test_prepull_rule_check_branches(agent, container, days, savings, expected):
+    """Test each deterministic pre-pull rule and the ambiguous cases left to the LLM."""
+    assert agent._prepull_rule_check(container, days, savings) is expected
+
+
+def test_unknown_last_free_day_defers_to_llm(agent, monkeypatch):
+    """Test a container without a last free day is decided by the LLM, not a rule."""
+    llm = AsyncMock(return_value=PrepullDecision(
+        recommend_prepull=False, reasoning="Last free day unknown", confidence=0.6
+    ))
+    monkeypatch.setattr(agent, "_invoke_llm_structured", llm)
+    customer = SimpleNamespace(pre_pull_fee=75.0, per_diem_rate=100.0)
+
+    result = asyncio.run(agent.should_prepull_container(_container(), customer))
+
+    assert result["recommendation"] == "NO"
+    assert result["reasoning"] == "Last free day unknown"
+    assert '"days_until_last_free":null' in llm.await_args.kwargs["human_message"]
+
+
+def test_update_container_statuses_stamps_naive_utc(agent, monkeypatch):
+    """Test the batch update stamps last_updated with the current UTC time, stored naive."""
+    container = _container(terminal49_tracking_id="T49-1", last_updated=None)
+    t49 = SimpleNamespace(
+        current_status="available", location="Terminal 1", vessel_departed_pol=None,
+        vessel_arrived_pod=None, vessel_discharged=None, available_for_pickup=None,
+        picked_up=None, delivered=None, returned_empty=None, holds=None, raw_data={},
+    )
+    monkeypatch.setattr(
+        agent.terminal49, "get_container_statuses", AsyncMock(return_value={"T49-1": t49})
+    )
+    agent.db = SimpleNamespace(commit=lambda: None)
+
+    before = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert asyncio.run(agent.update_container_statuses([container])) == 1
+
+    assert container.last_updated.tzinfo is None
+    assert before <= container.last_updated <= datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def test_check_alerts_saves_unless_caller_defers_flush(db_session, make_load):
+    """Test check_alerts commits its alerts by default and only queues them with flush=False."""
+    load = make_load(container=True)
+    tracking = TrackingAgent(db_session)
+
+    assert tracking.check_alerts(load.container, flush=False)
+    assert db_session.query(Alert).count() == 0
+    tracking.alert_service.flush()
+    saved = db_session.query(Alert).count()
+
+    db_session.query(Alert).delete()
+    db_session.commit()
+    assert tracking.check_alerts(load.container)
+    assert db_session.query(Alert).count() == saved > 0
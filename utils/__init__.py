@@ -10,6 +10,8 @@ from utils.date_helpers import (
     is_weekend,
     is_business_day,
     format_date_display,
+    to_iso,
+    utc_now_iso,
 )
 from utils.retry import (
     retry_with_backoff,
@@ -17,6 +19,7 @@ from utils.retry import (
     exponential_backoff,
     RetryContext,
 )
+from utils.async_helpers import run_sync
 
 __all__ = [
     "validate_container_number",
@@ -27,9 +30,12 @@ __all__ = [
     "is_weekend",
     "is_business_day",
     "format_date_display",
+    "to_iso",
+    "utc_now_iso",
     "retry_with_backoff",
     "retry_async_with_backoff",
     "exponential_backoff",
     "RetryContext",
+    "run_sync",
 ]
 
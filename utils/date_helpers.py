@@ -1,6 +1,9 @@
 """Date and time utility functions."""
-from datetime import date, datetime, timedelta
-from typing import Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterator, Optional
 
 import pytz
 from constants import DATE_FORMAT_DISPLAY, DATETIME_FORMAT_DISPLAY
@@ -11,6 +14,19 @@ def is_weekend(check_date: date) -> bool:
     return check_date.weekday() >= 5  # Saturday = 5, Sunday = 6
 
 
+def is_business_day(check_date: date) -> bool:
+    """Return True if date falls on a weekday."""
+    return not is_weekend(check_date)
+
+
+def calculate_business_days(start_date: date, end_date: date) -> int:
+    """Return the number of business days after start_date up to and including end_date."""
+    return sum(
+        1 for offset in range(1, (end_date - start_date).days + 1)
+        if is_business_day(start_date + timedelta(days=offset))
+    )
+
+
 def add_business_days(start_date: date, days: int) -> date:
     """Add business days to a date, skipping weekends."""
     current = start_date
@@ -42,6 +58,46 @@ def format_date_display(
         return dt.strftime(DATE_FORMAT_DISPLAY)
 
 
+@lru_cache(maxsize=4096)
+def _date_isoformat(d: date) -> str:
+    return d.isoformat()
+
+
+def to_iso(dt: Optional[date | datetime]) -> Optional[str]:
+    """Return dt.isoformat(); None passes through.
+
+    Plain dates are memoized. Datetimes are formatted directly, since equal
+    aware datetimes in different zones would share a cache entry.
+    """
+    if dt is None:
+        return None
+    if type(dt) is date:
+        return _date_isoformat(dt)
+    return dt.isoformat()
+
+
+_frozen_now_iso: ContextVar[Optional[str]] = ContextVar("_frozen_now_iso", default=None)
+
+
+def utc_now_iso() -> str:
+    """Return the current UTC time as second-precision ISO-8601 with a +00:00 offset."""
+    frozen = _frozen_now_iso.get()
+    if frozen is not None:
+        return frozen
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+@contextmanager
+def frozen_utc_now() -> Iterator[str]:
+    """Make utc_now_iso return one shared timestamp within the block (and tasks it starts)."""
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    token = _frozen_now_iso.set(now)
+    try:
+        yield now
+    finally:
+        _frozen_now_iso.reset(token)
+
+
 def get_current_utc() -> datetime:
     """Return current UTC datetime."""
     return datetime.now(pytz.UTC)